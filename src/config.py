@@ -3,9 +3,61 @@ LAT = 47.322
 LON = 5.0415
 TIMEZONE = "Europe/Paris"
 
+# Délai (jours) entre une date observée et la première date cible qui peut s'en servir :
+# la prévision de J est émise la veille (J-1) et l'archive publie l'observation
+# de J-3 au plus tôt à ce moment-là. Les variables de mémoire (station et voisines)
+# et les biais des modèles NWP ne regardent donc que les erreurs jusqu'à J-3,
+# à l'entraînement comme en prédiction.
+DELAI_OBSERVATIONS = 3
+
 # Fichiers de données
 FORECASTS_CSV = "data/forecasts.csv"
 OBS_CSV       = "data/observations.csv"
 
+# Historique des prévisions corrigées publiées
+PREDICTIONS_CSV = "data/predictions.csv"
+
+# Exports pour les consommateurs : Parquet partitionné + index des dernières corrections (Arrow)
+EXPORTS_DIR    = "exports"
+DERNIERE_ARROW = "exports/derniere.arrow"
+
+# État du moniteur de dérive et journal des décisions de réentraînement (voir derive.py)
+DERIVE_JSON   = "data/derive.json"
+DECISIONS_CSV = "data/decisions_reentrainement.csv"
+
+# Lignes rejetées par les contrôles de qualité (voir validation.py)
+QUARANTAINE_CSV = "data/quarantaine.csv"
+
+# Dates (par station) dont l'observation a été ajoutée ou révisée depuis le dernier
+# entraînement : suivi de dérive à rejouer et métriques mensuelles à recalculer (voir reconcilier.py)
+RECALCUL_JSON = "data/a_recalculer.json"
+
+# MAE brute et corrigée par (station, mois, cible), recalculée mois par mois (voir metriques.py)
+METRIQUES_CSV = "data/metriques_mensuelles.csv"
+
+# Prévisions des modèles NWP supplémentaires (une paire de colonnes par modèle)
+FORECASTS_MODELES_CSV = "data/forecasts_modeles.csv"
+
+# Modèles Open-Meteo récupérés en plus du modèle par défaut ("best_match")
+MODELES_NWP = ["ecmwf_ifs025", "icon_seamless", "gfs_seamless", "meteofrance_seamless"]
+
+# Registre des stations (lat, lon) : la station principale et ses voisines
+STATION = "dijon"
+STATIONS = {
+    "dijon":    (LAT, LON),
+    "beaune":   (47.025, 4.840),
+    "dole":     (47.092, 5.490),
+    "besancon": (47.238, 6.024),
+    "chalon":   (46.781, 4.854),
+    "langres":  (47.863, 5.333),
+    "montbard": (47.623, 4.339),
+    "auxerre":  (47.798, 3.567),
+}
+NB_VOISINS = 4
+
+# Erreurs passées des stations voisines et cache des listes de voisins
+STATIONS_ERREURS_CSV = "data/stations_erreurs.csv"
+VOISINS_JSON         = "data/voisins.json"
+
 # Variables qu'on corrige (simple et utile)
 TARGETS = ["tmax", "tmin"]
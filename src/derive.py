@@ -0,0 +1,287 @@
+# src/derive.py
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Lissage exponentiel des moyennes glissantes (~ fenêtre de 2 / ALPHA - 1 = 14 jours)
+ALPHA = 2 / 15
+
+# Page-Hinkley sur le résidu corrigé : tolérance (°C/jour) et seuil d'alarme (°C cumulés)
+PH_DELTA = 0.25
+PH_SEUIL = 15.0
+
+# Biais moyen récent (°C) du résidu corrigé au-delà duquel on réentraîne
+SEUIL_BIAIS = 0.75
+
+# Décalage de la moyenne exponentielle des anomalies d'une variable surveillée (cycle
+# saisonnier retiré), en écarts-types de cette même moyenne sur l'historique d'entraînement
+# (limite de contrôle classique d'une carte EWMA)
+SEUIL_DECALAGE = 3.0
+
+# Marge (°C) dont l'erreur absolue corrigée peut dépasser l'erreur brute avant de réentraîner
+SEUIL_DEGRADATION = 0.25
+
+# Entrées météo surveillées en plus de la prévision brute et de la dernière erreur connue
+VARIABLES_METEO = ["rad_prev", "cloud_prev", "prcp_prev", "ws_prev", "sun_prev"]
+
+# Nombre minimal de jours observés avant qu'une alarme puisse se déclencher
+JOURS_MINIMUM = 7
+
+# Réentraînement de sécurité si le modèle n'a pas été réentraîné depuis ce nombre de jours
+JOURS_MAX_SANS_REENTRAINEMENT = 30
+
+
+def variables_surveillees(variable_cible: str) -> list[str]:
+    """Variables dont la distribution est comparée à celle du dernier entraînement."""
+    return [f"err_{variable_cible}_j1", f"{variable_cible}_prev"] + VARIABLES_METEO
+
+
+def ajouter_reference(reference: dict, valeur: float) -> dict:
+    """Intègre une valeur à une référence {n, moy, m2} en O(1) (algorithme de Welford)."""
+    if np.isnan(valeur):
+        return reference
+    reference["n"] += 1
+    ecart = valeur - reference["moy"]
+    reference["moy"] += ecart / reference["n"]
+    reference["m2"] += ecart * (valeur - reference["moy"])
+    return reference
+
+
+def angle_saisonnier(dates) -> np.ndarray:
+    """Angle (radians) du jour de l'année, pour la climatologie harmonique."""
+    return 2 * np.pi * (pd.DatetimeIndex(pd.to_datetime(dates)).dayofyear.to_numpy() - 1) / 365.25
+
+
+def climatologie(dates, valeurs: np.ndarray) -> list[float]:
+    """
+    Ajuste le cycle saisonnier d'une variable (moyenne + première harmonique
+    du jour de l'année) par moindres carrés. Renvoie les 3 coefficients.
+    """
+    valides = ~np.isnan(valeurs)
+    if valides.sum() < 3:
+        return [float(np.nanmean(valeurs)) if valides.any() else 0.0, 0.0, 0.0]
+    angles = angle_saisonnier(dates)[valides]
+    base = np.column_stack([np.ones(len(angles)), np.sin(angles), np.cos(angles)])
+    coefficients, *_ = np.linalg.lstsq(base, valeurs[valides], rcond=None)
+    return [float(c) for c in coefficients]
+
+
+def anomalie(clim: list[float], angle: float, valeur: float) -> float:
+    """Écart d'une valeur à la climatologie du jour (O(1) ; accepte aussi des tableaux numpy)."""
+    return valeur - (clim[0] + clim[1] * np.sin(angle) + clim[2] * np.cos(angle))
+
+
+def references_variables(tableau: pd.DataFrame, noms: list[str]) -> dict:
+    """
+    Construit, pour chaque variable, sa climatologie sur 'tableau' (données du
+    dernier entraînement) puis la référence {n, moy, m2} de la moyenne exponentielle
+    de ses anomalies, celle-là même que le moniteur compare ensuite (NaN ignorées) :
+    ni le cycle saisonnier ni la persistance normale du temps ne comptent comme une dérive.
+    """
+    angles = angle_saisonnier(tableau["date"])
+    references = {}
+    for nom in noms:
+        reference = {"n": 0, "moy": 0.0, "m2": 0.0, "clim": [0.0, 0.0, 0.0]}
+        if nom in tableau.columns:
+            valeurs = tableau[nom].to_numpy(dtype=float)
+            reference["clim"] = climatologie(tableau["date"], valeurs)
+            anomalies = pd.Series(anomalie(reference["clim"], angles, valeurs))
+            lissees = anomalies.ewm(alpha=ALPHA, ignore_na=True).mean().where(anomalies.notna())
+            # Les premiers jours (moyenne pas encore stabilisée) ne servent pas de référence
+            for valeur in lissees.to_numpy()[JOURS_MINIMUM:]:
+                ajouter_reference(reference, valeur)
+        references[nom] = reference
+    return references
+
+
+def ecart_type_reference(reference: dict) -> float:
+    """Écart-type d'une référence {n, moy, m2} (1 si indéfini ou nul)."""
+    if reference["n"] < 2 or reference["m2"] <= 0:
+        return 1.0
+    return float(np.sqrt(reference["m2"] / (reference["n"] - 1)))
+
+
+def etat_initial(references: dict | None = None,
+                 date_entrainement: str | None = None, debut_suivi: str | None = None) -> dict:
+    """
+    État du moniteur pour une (station, cible), sérialisable en JSON.
+    'references' décrit chaque variable surveillée (climatologie et {n, moy, m2}
+    de ses anomalies) sur les données du dernier entraînement ; le suivi reprend après debut_suivi
+    (dernière date vue à l'entraînement).
+    """
+    variables = {
+        nom: {"n": r["n"], "moy": r["moy"], "m2": r["m2"], "clim": r["clim"], "moy_recente": r["moy"]}
+        for nom, r in (references or {}).items()
+    }
+    return {
+        "n": 0,
+        "derniere_date": debut_suivi,
+        "debut_suivi": debut_suivi,
+        "date_entrainement": date_entrainement,
+        # Moyennes exponentielles
+        "moy_residu": 0.0,
+        "moy_abs_residu": 0.0,
+        "moy_abs_brute": 0.0,
+        # Page-Hinkley (hausse et baisse du résidu)
+        "ph_moyenne": 0.0,
+        "ph_cumul_hausse": 0.0,
+        "ph_min_hausse": 0.0,
+        "ph_cumul_baisse": 0.0,
+        "ph_max_baisse": 0.0,
+        # Variables surveillées : climatologie, référence des anomalies (Welford)
+        # et moyenne exponentielle récente des anomalies
+        "variables": variables,
+    }
+
+
+def mettre_a_jour(etat: dict, date: str, residu: float, erreur_brute: float, valeurs: dict) -> dict:
+    """
+    Intègre une nouvelle journée en O(1) :
+      - residu       : observation - prévision corrigée
+      - erreur_brute : observation - prévision brute
+      - valeurs      : {variable surveillée: valeur du jour} (NaN ignorées)
+    """
+    if np.isnan(residu) or np.isnan(erreur_brute):
+        return etat
+
+    etat["n"] += 1
+    etat["derniere_date"] = date
+    a = ALPHA if etat["n"] > 1 else 1.0
+
+    etat["moy_residu"] += a * (residu - etat["moy_residu"])
+    etat["moy_abs_residu"] += a * (abs(residu) - etat["moy_abs_residu"])
+    etat["moy_abs_brute"] += a * (abs(erreur_brute) - etat["moy_abs_brute"])
+    angle = angle_saisonnier([date])[0]
+    for nom, suivi in etat["variables"].items():
+        valeur = valeurs.get(nom, np.nan)
+        if not np.isnan(valeur):
+            suivi["moy_recente"] += ALPHA * (anomalie(suivi["clim"], angle, valeur) - suivi["moy_recente"])
+
+    etat["ph_moyenne"] += (residu - etat["ph_moyenne"]) / etat["n"]
+    etat["ph_cumul_hausse"] += residu - etat["ph_moyenne"] - PH_DELTA
+    etat["ph_min_hausse"] = min(etat["ph_min_hausse"], etat["ph_cumul_hausse"])
+    etat["ph_cumul_baisse"] += residu - etat["ph_moyenne"] + PH_DELTA
+    etat["ph_max_baisse"] = max(etat["ph_max_baisse"], etat["ph_cumul_baisse"])
+    return etat
+
+
+def mettre_a_jour_tableau(etat: dict, tableau: pd.DataFrame, variable_cible: str) -> dict:
+    """
+    Intègre, dans l'ordre, les jours de 'tableau' postérieurs à etat['derniere_date'].
+    Colonnes attendues : date, <cible>_obs, <cible>_prev, <cible>_corr et les variables
+    surveillées (une variable absente est ignorée).
+    """
+    nouveaux = tableau.sort_values("date")
+    if etat["derniere_date"] is not None:
+        nouveaux = nouveaux[nouveaux["date"] > etat["derniere_date"]]
+
+    obs = nouveaux[f"{variable_cible}_obs"].to_numpy(dtype=float)
+    residus = obs - nouveaux[f"{variable_cible}_corr"].to_numpy(dtype=float)
+    erreurs_brutes = obs - nouveaux[f"{variable_cible}_prev"].to_numpy(dtype=float)
+    noms = list(etat["variables"])
+    valeurs = nouveaux.reindex(columns=noms).to_numpy(dtype=float)
+
+    for date, residu, erreur_brute, ligne in zip(nouveaux["date"], residus, erreurs_brutes, valeurs):
+        mettre_a_jour(etat, date, residu, erreur_brute, dict(zip(noms, ligne)))
+    return etat
+
+
+def statistiques(etat: dict) -> list[tuple[str, float, float]]:
+    """Renvoie toutes les statistiques surveillées : (nom, valeur, seuil)."""
+    valeurs = [
+        ("page_hinkley_hausse", etat["ph_cumul_hausse"] - etat["ph_min_hausse"], PH_SEUIL),
+        ("page_hinkley_baisse", etat["ph_max_baisse"] - etat["ph_cumul_baisse"], PH_SEUIL),
+        ("biais_residu", abs(etat["moy_residu"]), SEUIL_BIAIS),
+        ("degradation_vs_brute", etat["moy_abs_residu"] - etat["moy_abs_brute"], SEUIL_DEGRADATION),
+    ]
+    # Un décalage par variable surveillée : le journal indique laquelle a déclenché
+    for nom, suivi in etat["variables"].items():
+        if suivi["n"] > 0:
+            valeurs.append((f"decalage_{nom}",
+                            abs(suivi["moy_recente"] - suivi["moy"]) / ecart_type_reference(suivi), SEUIL_DECALAGE))
+    return [(nom, float(valeur), seuil) for nom, valeur, seuil in valeurs]
+
+
+def evaluer(etat: dict) -> list[tuple[str, float, float]]:
+    """
+    Renvoie la liste des alarmes déclenchées : (statistique, valeur, seuil).
+    Vide si le modèle est stable ou si trop peu de jours ont été suivis.
+    """
+    if etat["n"] < JOURS_MINIMUM:
+        return []
+    return [(nom, valeur, seuil) for nom, valeur, seuil in statistiques(etat) if valeur > seuil]
+
+
+def decider_reentrainement(etat: dict | None, date_du_jour: str, modele_existe: bool) -> tuple[bool, str, float, float]:
+    """
+    Décide s'il faut réentraîner le modèle d'une (station, cible).
+
+    Returns:
+        (reentrainer, statistique, valeur, seuil) : la statistique qui a motivé la décision
+    """
+    if not modele_existe:
+        return True, "modele_absent", float("nan"), float("nan")
+    if etat is None or etat["date_entrainement"] is None or not _etat_a_jour(etat):
+        return True, "moniteur_absent", float("nan"), float("nan")
+
+    age = (pd.to_datetime(date_du_jour) - pd.to_datetime(etat["date_entrainement"])).days
+    if age >= JOURS_MAX_SANS_REENTRAINEMENT:
+        return True, "age_modele_jours", float(age), float(JOURS_MAX_SANS_REENTRAINEMENT)
+
+    if etat["n"] < JOURS_MINIMUM:
+        return False, "jours_suivis", float(etat["n"]), float(JOURS_MINIMUM)
+
+    alarmes = evaluer(etat)
+    if alarmes:
+        # On retient l'alarme la plus nette (valeur la plus au-dessus de son seuil)
+        nom, valeur, seuil = max(alarmes, key=lambda alarme: alarme[1] - alarme[2])
+        return True, nom, valeur, seuil
+
+    # Stable : on journalise la statistique la plus proche de son seuil
+    nom, valeur, seuil = max(statistiques(etat), key=lambda stat: stat[1] - stat[2])
+    return False, nom, valeur, seuil
+
+
+def _etat_a_jour(etat: dict) -> bool:
+    """Vrai si l'état a le format courant (variables surveillées avec climatologie)."""
+    return "variables" in etat and all("clim" in suivi for suivi in etat["variables"].values())
+
+
+def charger_etats(chemin_fichier: str) -> dict:
+    """Renvoie {station: {cible: état}} depuis le JSON (vide s'il n'existe pas)."""
+    try:
+        with open(chemin_fichier, encoding="utf-8") as fichier:
+            return json.load(fichier)
+    except FileNotFoundError:
+        return {}
+
+
+def sauvegarder_etats(etats: dict, chemin_fichier: str) -> None:
+    """Écrit les états du moniteur dans le JSON."""
+    chemin = Path(chemin_fichier)
+    chemin.parent.mkdir(parents=True, exist_ok=True)
+    with open(chemin, "w", encoding="utf-8") as fichier:
+        json.dump(etats, fichier, ensure_ascii=False, indent=2)
+
+
+def journaliser_decision(chemin_fichier: str, date_du_jour: str, station: str, variable_cible: str,
+                         reentrainer: bool, statistique: str, valeur: float, seuil: float) -> None:
+    """Ajoute une ligne (décision + statistique déclenchante) au journal CSV des décisions."""
+    ligne = pd.DataFrame([{
+        "date": date_du_jour,
+        "station": station,
+        "cible": variable_cible,
+        "decision": "reentrainement" if reentrainer else "conserve",
+        "statistique": statistique,
+        "valeur": round(valeur, 4),
+        "seuil": seuil,
+    }])
+    chemin = Path(chemin_fichier)
+    chemin.parent.mkdir(parents=True, exist_ok=True)
+    ligne.to_csv(chemin, mode="a", header=not chemin.exists(), index=False)
+
+    action = "réentraînement" if reentrainer else "modèle conservé"
+    print(f"[derive] {station}/{variable_cible} : {action} ({statistique} = {valeur:.2f}, seuil {seuil})")
@@ -0,0 +1,96 @@
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from config import STATION, PREDICTIONS_CSV, EXPORTS_DIR, DERNIERE_ARROW
+
+# Colonnes exportées pour chaque correction (les colonnes de partition sont dans le chemin)
+COLONNES_EXPORT = ["station", "date", "date_emission", "tmax_prev", "tmax_corr", "tmin_prev", "tmin_corr"]
+
+
+def preparer_corrections(predictions: pd.DataFrame, station: str) -> pd.DataFrame:
+    """
+    Ajoute la station et la date d'émission (veille de la date prévue, prévision J+1)
+    aux corrections de data/predictions.csv.
+    """
+    tableau = predictions.copy()
+    tableau["station"] = station
+    tableau["date_emission"] = (pd.to_datetime(tableau["date"]) - pd.Timedelta(days=1)).dt.strftime("%Y-%m-%d")
+    tableau["mois_emission"] = tableau["date_emission"].str[:7]
+    return tableau[COLONNES_EXPORT + ["mois_emission"]].sort_values(["station", "date"])
+
+
+def ecrire_partitions(tableau: pd.DataFrame, dossier: str) -> int:
+    """
+    Écrit une partition Parquet par (mois d'émission, station), au format Hive :
+    <dossier>/corrections/mois_emission=AAAA-MM/station=<nom>/part-0.parquet
+    Seules les partitions présentes dans 'tableau' sont réécrites.
+    """
+    nombre = 0
+    for (mois, station), groupe in tableau.groupby(["mois_emission", "station"]):
+        chemin = Path(dossier) / "corrections" / f"mois_emission={mois}" / f"station={station}" / "part-0.parquet"
+        chemin.parent.mkdir(parents=True, exist_ok=True)
+        table = pa.Table.from_pandas(groupe.drop(columns=["mois_emission", "station"]), preserve_index=False)
+        pq.write_table(table, chemin)
+        nombre += 1
+    return nombre
+
+
+def lire_derniere(chemin_fichier: str) -> pd.DataFrame | None:
+    """Lit l'index « dernière correction par station » (fichier Arrow IPC), ou None s'il n'existe pas."""
+    if not Path(chemin_fichier).exists():
+        return None
+    with pa.memory_map(chemin_fichier, "r") as source:
+        return pa.ipc.open_file(source).read_all().to_pandas()
+
+
+def ecrire_derniere(tableau: pd.DataFrame, chemin_fichier: str) -> pd.DataFrame:
+    """
+    Met à jour l'index compact des dernières corrections (une ligne par station)
+    dans un fichier Arrow IPC non compressé, lisible en mémoire mappée.
+    L'écriture passe par un fichier temporaire pour rester atomique.
+    """
+    dernieres = tableau.sort_values("date").groupby("station").tail(1)[COLONNES_EXPORT]
+
+    ancien = lire_derniere(chemin_fichier)
+    if ancien is not None:
+        dernieres = pd.concat([ancien[~ancien["station"].isin(dernieres["station"])], dernieres], ignore_index=True)
+    dernieres = dernieres.sort_values("station").reset_index(drop=True)
+
+    table = pa.Table.from_pandas(dernieres, preserve_index=False)
+    temporaire = f"{chemin_fichier}.tmp"
+    Path(chemin_fichier).parent.mkdir(parents=True, exist_ok=True)
+    with pa.OSFile(temporaire, "wb") as fichier, pa.ipc.new_file(fichier, table.schema) as ecrivain:
+        ecrivain.write_table(table)
+    os.replace(temporaire, chemin_fichier)
+    return dernieres
+
+
+def main():
+    """
+    Exporte data/predictions.csv en Parquet partitionné et met à jour l'index des dernières corrections.
+    Par défaut, seuls les mois d'émission à partir de la dernière correction déjà exportée
+    sont réécrits ; '--complet' réécrit tout l'historique.
+    """
+    predictions = pd.read_csv(PREDICTIONS_CSV)
+    tableau = preparer_corrections(predictions, STATION)
+
+    derniere = lire_derniere(DERNIERE_ARROW)
+    if "--complet" not in sys.argv and derniere is not None and STATION in derniere["station"].values:
+        date_exportee = derniere.loc[derniere["station"] == STATION, "date_emission"].iloc[0]
+        mois_a_reecrire = tableau.loc[tableau["date_emission"] >= date_exportee, "mois_emission"].unique()
+        a_ecrire = tableau[tableau["mois_emission"].isin(mois_a_reecrire)]
+    else:
+        a_ecrire = tableau
+
+    nombre = ecrire_partitions(a_ecrire, EXPORTS_DIR)
+    ecrire_derniere(tableau, DERNIERE_ARROW)
+    print(f"[OK] {nombre} partition(s) Parquet écrite(s) dans {EXPORTS_DIR}/, index {DERNIERE_ARROW} à jour.")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,44 @@
 import pandas as pd
 import numpy as np
 
+from config import DELAI_OBSERVATIONS
+from modeles_nwp import colonne_modele
+
+# Variables de mémoire (erreurs passées) communes aux modèles tmax et tmin
+COLONNES_MEMOIRE = [
+    "err_tmax_j1", "err_tmax_j2", "err_tmax_moy_7j", "err_tmax_std_7j",
+    "err_tmin_j1", "err_tmin_j2", "err_tmin_moy_7j", "err_tmin_std_7j",
+]
+
+# Erreurs passées des stations voisines (pondérées par la distance)
+COLONNES_VOISINS = [
+    "err_tmax_voisins_j1", "err_tmax_voisins_moy_7j",
+    "err_tmin_voisins_j1", "err_tmin_voisins_moy_7j",
+]
+
+
+def colonnes_explicatives(variable_cible: str, modeles: list[str] = (), voisins: bool = False) -> list[str]:
+    """
+    Liste ordonnée des variables explicatives du modèle de correction.
+    Si des modèles NWP sont fournis, ajoute la prévision combinée et,
+    pour chaque modèle, son écart au modèle par défaut et son biais récent.
+    Si voisins est vrai, ajoute les erreurs passées des stations voisines.
+    """
+    colonnes = [
+        f"{variable_cible}_prev",
+        "doy_sin", "doy_cos",
+        "prcp_prev", "ws_prev",
+        "rad_prev", "sun_prev", "cloud_prev",
+        *COLONNES_MEMOIRE,
+    ]
+    if modeles:
+        colonnes.append(f"{variable_cible}_prev_blend")
+        for modele in modeles:
+            colonnes += [f"ecart_{variable_cible}_{modele}", f"biais_{variable_cible}_{modele}"]
+    if voisins:
+        colonnes += COLONNES_VOISINS
+    return colonnes
+
 
 def ajouter_variables_calendrier(tableau: pd.DataFrame) -> pd.DataFrame:
     """
@@ -24,38 +62,94 @@ def ajouter_variables_calendrier(tableau: pd.DataFrame) -> pd.DataFrame:
     return tableau
 
 
-def ajouter_variables_memoire(tableau: pd.DataFrame) -> pd.DataFrame:
+def ajouter_variables_memoire(tableau: pd.DataFrame, delai: int = DELAI_OBSERVATIONS) -> pd.DataFrame:
     """
     Ajoute des variables décalées (lagged) et des moyennes glissantes (rolling)
-    basées sur les erreurs des jours précédents.
+    basées sur les erreurs déjà connues à l'émission de la prévision :
+      - err_<var>_j1 / _j2       : erreurs de J-delai et J-delai-1
+      - err_<var>_moy_7j / _std_7j : sur les 7 jours se terminant à J-delai
+    Les décalages et fenêtres sont en jours calendaires : un jour manquant
+    reste un trou (NaN) au lieu de décaler les lignes suivantes.
     """
     tableau = tableau.sort_values("date")
+    dates = pd.DatetimeIndex(pd.to_datetime(tableau["date"]))
+    calendrier = pd.date_range(dates.min(), dates.max(), freq="D")
 
     for var in ["tmax", "tmin"]:
         err_col = f"err_{var}"
+        erreurs = pd.Series(tableau[err_col].to_numpy(), index=dates).reindex(calendrier)
 
-        # On décale d'abord les données pour n'utiliser que le passé
-        erreurs_passees = tableau[err_col].shift(1)
+        # Erreurs connues à l'émission (NaN si ces jours manquent)
+        connues = erreurs.shift(delai)
+        tableau[f"{err_col}_j1"] = connues.reindex(dates).to_numpy()
+        tableau[f"{err_col}_j2"] = erreurs.shift(delai + 1).reindex(dates).to_numpy()
 
-        # Décalages simples : erreurs des jours précédents
-        tableau[f"{err_col}_j1"] = erreurs_passees
-        tableau[f"{err_col}_j2"] = tableau[err_col].shift(2)
-
-        # Fenêtres glissantes sur les erreurs PASSÉES
-        tableau[f"{err_col}_moy_7j"] = erreurs_passees.rolling(window=7, min_periods=1).mean()
-        tableau[f"{err_col}_std_7j"] = erreurs_passees.rolling(window=7, min_periods=1).std()
+        # Fenêtres glissantes sur les 7 derniers jours connus, trous ignorés
+        fenetre_connue = connues.rolling(7, min_periods=1)
+        tableau[f"{err_col}_moy_7j"] = fenetre_connue.mean().reindex(dates).to_numpy()
+        tableau[f"{err_col}_std_7j"] = fenetre_connue.std().reindex(dates).to_numpy()
 
     return tableau
 
 
-def prepare_merged(previsions: pd.DataFrame, observations: pd.DataFrame) -> pd.DataFrame:
+def ajouter_variables_modeles(tableau: pd.DataFrame, modeles: list[str], fenetre: int = 7,
+                              delai: int = DELAI_OBSERVATIONS) -> pd.DataFrame:
+    """
+    Ajoute, pour chaque modèle NWP et chaque variable (tmax, tmin) :
+      - ecart_<var>_<modele> : écart entre la prévision du modèle et celle par défaut
+      - biais_<var>_<modele> : moyenne des erreurs du modèle sur les 'fenetre' jours
+                               se terminant à J-delai (déjà connues à l'émission)
+    ainsi que <var>_prev_blend, la moyenne des prévisions débiaisées pondérée
+    par l'inverse de la MAE de chaque modèle sur la même fenêtre.
+
+    Tous les modèles sont traités d'un bloc (matrice jours × modèles).
+    Le tableau doit être trié par date et contenir <var>_prev et <var>_obs.
+    """
+    nouvelles_colonnes = {}
+    dates = pd.DatetimeIndex(pd.to_datetime(tableau["date"]))
+    calendrier = pd.date_range(dates.min(), dates.max(), freq="D")
+
+    for var in ["tmax", "tmin"]:
+        prev_defaut = tableau[f"{var}_prev"].to_numpy(dtype=float)
+        prev = tableau[[colonne_modele(var, m) for m in modeles]].to_numpy(dtype=float)
+        erreurs = tableau[f"{var}_obs"].to_numpy(dtype=float)[:, None] - prev
+
+        # Uniquement les erreurs connues à l'émission : 'fenetre' jours calendaires jusqu'à J-delai
+        connues = pd.DataFrame(erreurs, index=dates).reindex(calendrier).shift(delai)
+        biais = connues.rolling(fenetre, min_periods=1).mean().reindex(dates).to_numpy()
+        mae = connues.abs().rolling(fenetre, min_periods=1).mean().reindex(dates).to_numpy()
+
+        # Poids : inverse de la MAE récente (poids égaux sans historique), nul si prévision absente
+        poids = np.where(np.isnan(mae), 1.0, 1.0 / (mae + 0.1))
+        poids[np.isnan(prev)] = 0.0
+        corrigees = np.nan_to_num(prev + np.nan_to_num(biais))
+        somme_poids = poids.sum(axis=1)
+        blend = np.divide((poids * corrigees).sum(axis=1), somme_poids,
+                          out=prev_defaut.copy(), where=somme_poids > 0)
+
+        nouvelles_colonnes[f"{var}_prev_blend"] = blend
+        for i, modele in enumerate(modeles):
+            nouvelles_colonnes[f"ecart_{var}_{modele}"] = prev[:, i] - prev_defaut
+            nouvelles_colonnes[f"biais_{var}_{modele}"] = biais[:, i]
+
+    return tableau.assign(**nouvelles_colonnes)
+
+
+def prepare_merged(previsions: pd.DataFrame, observations: pd.DataFrame,
+                   previsions_modeles: pd.DataFrame | None = None,
+                   modeles: list[str] = (),
+                   variables_voisins: pd.DataFrame | None = None) -> pd.DataFrame:
     """
     Fusionne les prévisions et observations sur la colonne 'date',
     ajoute les variables de calendrier et de mémoire,
     calcule les erreurs à apprendre,
     puis renvoie un tableau propre (sans valeurs manquantes critiques).
+    Si des prévisions de modèles NWP ou des variables de voisinage
+    (voir voisins.py) sont fournies, les ajoute aussi.
     """
     tableau = previsions.merge(observations, on="date", how="inner")
+    if previsions_modeles is not None and modeles:
+        tableau = tableau.merge(previsions_modeles, on="date", how="left")
     tableau = ajouter_variables_calendrier(tableau)
 
     # Erreurs cibles (à apprendre)
@@ -64,11 +158,14 @@ def prepare_merged(previsions: pd.DataFrame, observations: pd.DataFrame) -> pd.D
 
     # Ajout des variables décalées et des moyennes glissantes
     tableau = ajouter_variables_memoire(tableau)
+    if previsions_modeles is not None and modeles:
+        tableau = ajouter_variables_modeles(tableau, modeles)
+    if variables_voisins is not None:
+        tableau = tableau.merge(variables_voisins, on="date", how="left")
 
-    # Remplir les quelques NaN restants (pour l'écart-type au début) avec 0
-    tableau = tableau.fillna(0)
+    # Les NaN restants (jours manquants, début d'historique) sont laissés tels quels :
+    # HistGradientBoosting gère nativement les valeurs manquantes, alors qu'un 0
+    # serait lu comme une erreur nulle. Seules les lignes sans aucune erreur sont retirées.
+    tableau = tableau.dropna(subset=["err_tmax", "err_tmin"], how="all")
 
-    # Filtrage : on enlève les lignes du tout début (NaN dus aux shifts)
-    # C'est maintenant géré par .fillna(0) pour ne pas perdre de données
-    
     return tableau
\ No newline at end of file
@@ -2,9 +2,12 @@ import os
 import requests
 import pandas as pd
 from pathlib import Path
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from dateutil import tz
-from config import LAT, LON, TIMEZONE, FORECASTS_CSV
+from config import LAT, LON, TIMEZONE, FORECASTS_CSV, FORECASTS_MODELES_CSV, MODELES_NWP, QUARANTAINE_CSV
+from modeles_nwp import recuperer_modeles, fusionner_modeles
+from seed_history import URL_HISTORIQUE_PREVISIONS
+from validation import valider, mettre_en_quarantaine, BORNES_PREV
 
 # URL de l'API Open-Meteo pour les prévisions quotidiennes
 URL_PREVISIONS = "https://api.open-meteo.com/v1/forecast"
@@ -66,23 +69,33 @@ def main():
 
     indice = liste_dates.index(date_demain)
 
+    def valeur(cle):
+        # Une valeur absente devient NaN (et non une erreur), les contrôles décident ensuite
+        valeurs = donnees_quotidiennes.get(cle) or [None] * len(liste_dates)
+        return float(valeurs[indice]) if valeurs[indice] is not None else float("nan")
+
     # Construction de la ligne à enregistrer
     ligne = {
         "date": str(date_demain),
-        "tmax_prev": float(donnees_quotidiennes["temperature_2m_max"][indice]),
-        "tmin_prev": float(donnees_quotidiennes["temperature_2m_min"][indice]),
-        "prcp_prev": float(donnees_quotidiennes.get("precipitation_sum", [None])[indice]),
-        "ws_prev":   float(donnees_quotidiennes.get("windspeed_10m_max", [None])[indice]),
+        "tmax_prev": valeur("temperature_2m_max"),
+        "tmin_prev": valeur("temperature_2m_min"),
+        "prcp_prev": valeur("precipitation_sum"),
+        "ws_prev":   valeur("windspeed_10m_max"),
         # --- Nouveaux ajouts ---
-        "rad_prev":  float(donnees_quotidiennes.get("shortwave_radiation_sum", [None])[indice]),
-        "sun_prev":  float(donnees_quotidiennes.get("sunshine_duration", [None])[indice]),
-        "cloud_prev":float(donnees_quotidiennes.get("cloud_cover_mean", [None])[indice]),
+        "rad_prev":  valeur("shortwave_radiation_sum"),
+        "sun_prev":  valeur("sunshine_duration"),
+        "cloud_prev":valeur("cloud_cover_mean"),
         # --- Fin ajouts ---
         "source": "open-meteo"
     }
 
-    nouveau_tableau = pd.DataFrame([ligne])
     ancien_tableau = lire_csv_sans_echec(FORECASTS_CSV)
+    nouveau_tableau, quarantaine = valider(
+        pd.DataFrame([ligne]), ancien_tableau, BORNES_PREV, ["tmax_prev", "tmin_prev"]
+    )
+    mettre_en_quarantaine(quarantaine, "previsions", QUARANTAINE_CSV)
+    if nouveau_tableau.empty:
+        raise RuntimeError(f"La prévision du {ligne['date']} a échoué aux contrôles de qualité (voir {QUARANTAINE_CSV}).")
 
     if ancien_tableau is None:
         tableau_final = nouveau_tableau
@@ -96,6 +109,56 @@ def main():
     tableau_final.to_csv(FORECASTS_CSV, index=False)
     print(f"[OK] Prévision J+1 enregistrée pour {ligne['date']}.")
 
+    enregistrer_modeles_nwp(str(date_demain))
+
+
+def enregistrer_modeles_nwp(date_cible: str) -> None:
+    """
+    Récupère la prévision de chaque modèle NWP (MODELES_NWP) pour la date donnée,
+    en requêtes concurrentes, et la fusionne dans FORECASTS_MODELES_CSV.
+    Si le fichier n'existe pas encore (ou est vide), 3 ans d'historique sont d'abord récupérés
+    (sans toucher aux autres fichiers, contrairement à seed_history.py).
+    """
+    ancien_tableau = lire_csv_sans_echec(FORECASTS_MODELES_CSV)
+    if ancien_tableau is None or ancien_tableau.empty:
+        ancien_tableau = recuperer_historique_modeles_nwp(date_cible)
+
+    parametres = {
+        "latitude": LAT,
+        "longitude": LON,
+        "start_date": date_cible,
+        "end_date": date_cible,
+        "timezone": TIMEZONE,
+    }
+    nouveau_tableau = recuperer_modeles(URL_PREVISIONS, parametres, MODELES_NWP)
+    if nouveau_tableau.empty:
+        print("[AVERTISSEMENT] Aucun modèle NWP supplémentaire récupéré.")
+        return
+
+    tableau_final = fusionner_modeles(ancien_tableau, nouveau_tableau)
+    tableau_final.to_csv(FORECASTS_MODELES_CSV, index=False)
+    print(f"[OK] {(nouveau_tableau.shape[1] - 1) // 2} modèle(s) NWP enregistré(s) pour {date_cible}.")
+
+
+def recuperer_historique_modeles_nwp(date_cible: str) -> pd.DataFrame | None:
+    """
+    Récupère les 3 dernières années de prévisions des modèles NWP (API des prévisions
+    historiques) jusqu'à la veille de 'date_cible'. Renvoie None si rien n'a pu être récupéré.
+    """
+    date_fin = date.fromisoformat(date_cible) - timedelta(days=1)
+    date_debut = date_fin.replace(year=date_fin.year - 3)
+    print(f"[modeles] Historique des modèles NWP absent : téléchargement {date_debut} → {date_fin} ...")
+
+    parametres = {
+        "latitude": LAT,
+        "longitude": LON,
+        "start_date": str(date_debut),
+        "end_date": str(date_fin),
+        "timezone": TIMEZONE,
+    }
+    tableau = recuperer_modeles(URL_HISTORIQUE_PREVISIONS, parametres, MODELES_NWP)
+    return None if tableau.empty else tableau
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -2,7 +2,9 @@ import pandas as pd
 import requests
 from datetime import datetime, timedelta
 from dateutil import tz
-from config import LAT, LON, TIMEZONE, OBS_CSV
+from config import LAT, LON, TIMEZONE, OBS_CSV, QUARANTAINE_CSV, STATION
+from reconcilier import marquer_a_recalculer
+from validation import valider, mettre_en_quarantaine, trous_de_dates, retirer_non_publiees, BORNES_OBS
 
 # URL de l'API Open-Meteo pour les observations historiques réelles
 URL_OBSERVATIONS = "https://archive-api.open-meteo.com/v1/archive"
@@ -13,6 +15,8 @@ def main():
     Récupère les observations réelles d'hier (J-1) via Open-Meteo Archive et les stocke dans OBS_CSV.
     - Remplace la ligne d'hier si elle existe déjà.
     - Crée le fichier si besoin.
+    - Ignore (avec un message) un jour que l'archive n'a pas encore publié.
+    - Met en quarantaine (sans l'écrire) une observation qui échoue aux contrôles de qualité.
     Colonnes : date, tmax_obs, tmin_obs, prcp_obs
     """
     # Hier selon le fuseau configuré (Europe/Paris dans ton projet)
@@ -50,17 +54,36 @@ def main():
         "prcp_obs": float(prcp) if prcp is not None else 0.0,
     }
 
-    nouveau = pd.DataFrame([ligne])
-
     try:
         courant = pd.read_csv(OBS_CSV)
-        courant = pd.concat([courant[courant["date"] != ligne["date"]], nouveau], ignore_index=True)
     except FileNotFoundError:
+        courant = None
+
+    # L'archive publie souvent la veille avec ~2 jours de retard : un jour encore nul n'est pas une erreur
+    nouveau = retirer_non_publiees(pd.DataFrame([ligne]), courant, ["tmax_obs", "tmin_obs"])
+    if nouveau.empty:
+        print(f"[INFO] Observation du {ligne['date']} pas encore publiée par l'archive, reprise par reconcilier.py.")
+        return
+
+    nouveau, quarantaine = valider(nouveau, courant, BORNES_OBS, ["tmax_obs", "tmin_obs"])
+    mettre_en_quarantaine(quarantaine, "observations", QUARANTAINE_CSV)
+    if nouveau.empty:
+        print(f"[AVERTISSEMENT] Observation du {ligne['date']} rejetée, rien n'est écrit.")
+        return
+
+    if courant is not None:
+        courant = pd.concat([courant[courant["date"] != ligne["date"]], nouveau], ignore_index=True)
+    else:
         courant = nouveau
 
     courant.to_csv(OBS_CSV, index=False)
+    marquer_a_recalculer(STATION, [ligne["date"]])
     print(f"[OK] Observation enregistrée pour {ligne['date']}.")
 
+    trous = trous_de_dates(courant["date"])
+    if trous:
+        print(f"[AVERTISSEMENT] {len(trous)} période(s) sans observation, ex. {trous[-1][0]} → {trous[-1][1]}.")
+
 
 if __name__ == "__main__":
     main()
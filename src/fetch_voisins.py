@@ -0,0 +1,93 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+import requests
+from dateutil import tz
+
+from config import STATION, STATIONS, TIMEZONE, STATIONS_ERREURS_CSV
+from seed_history import recuperer_previsions_historiques_openmeteo, recuperer_observations_openmeteo
+
+# Nombre de jours re-téléchargés à chaque mise à jour quotidienne
+JOURS_MISE_A_JOUR = 10
+
+
+def recuperer_erreurs_station(station: str, date_debut: str, date_fin: str) -> pd.DataFrame:
+    """
+    Récupère prévisions historiques et observations d'une station et renvoie ses erreurs.
+
+    Returns:
+        pd.DataFrame: colonnes 'date', 'station', 'err_tmax', 'err_tmin'
+    """
+    latitude, longitude = STATIONS[station]
+    df_prev = recuperer_previsions_historiques_openmeteo(latitude, longitude, date_debut, date_fin, TIMEZONE)
+    df_obs = recuperer_observations_openmeteo(latitude, longitude, date_debut, date_fin, TIMEZONE)
+
+    tableau = df_prev.merge(df_obs, on="date", how="inner")
+    return pd.DataFrame({
+        "date": tableau["date"],
+        "station": station,
+        "err_tmax": tableau["tmax_obs"] - tableau["tmax_prev"],
+        "err_tmin": tableau["tmin_obs"] - tableau["tmin_prev"],
+    })
+
+
+def mettre_a_jour_erreurs_voisins(date_debut: str, date_fin: str) -> pd.DataFrame | None:
+    """
+    Télécharge en parallèle les erreurs de toutes les stations voisines
+    sur la période et les fusionne dans STATIONS_ERREURS_CSV
+    (les couples (station, date) déjà présents sont remplacés).
+    Renvoie None, sans toucher au fichier, si aucune station n'a répondu.
+    """
+    stations = [nom for nom in STATIONS if nom != STATION]
+
+    def tache(station):
+        try:
+            return recuperer_erreurs_station(station, date_debut, date_fin)
+        except (requests.RequestException, RuntimeError, KeyError) as e:
+            print(f"[AVERTISSEMENT] Station {station} indisponible : {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, len(stations))) as executeur:
+        resultats = [t for t in executeur.map(tache, stations) if t is not None]
+
+    if not resultats:
+        return None
+    nouveau = pd.concat(resultats, ignore_index=True)
+
+    chemin = Path(STATIONS_ERREURS_CSV)
+    if chemin.exists():
+        ancien = pd.read_csv(chemin)
+        cles = pd.MultiIndex.from_frame(nouveau[["station", "date"]])
+        garder = ~pd.MultiIndex.from_frame(ancien[["station", "date"]]).isin(cles)
+        nouveau = pd.concat([ancien[garder], nouveau], ignore_index=True)
+
+    nouveau = nouveau.sort_values(["date", "station"])
+    chemin.parent.mkdir(parents=True, exist_ok=True)
+    nouveau.to_csv(chemin, index=False)
+    return nouveau
+
+
+def main():
+    """
+    Met à jour les erreurs des stations voisines : les JOURS_MISE_A_JOUR derniers jours,
+    ou 3 ans d'historique si le fichier n'existe pas encore.
+    """
+    date_fin = datetime.now(tz.gettz(TIMEZONE)).date()
+    if Path(STATIONS_ERREURS_CSV).exists():
+        date_debut = date_fin - timedelta(days=JOURS_MISE_A_JOUR)
+    else:
+        date_debut = date_fin.replace(year=date_fin.year - 3)
+
+    print(f"[voisins] Téléchargement des erreurs des stations voisines {date_debut} → {date_fin} ...")
+    tableau = mettre_a_jour_erreurs_voisins(str(date_debut), str(date_fin))
+    if tableau is None:
+        # Pas d'échec de la chaîne quotidienne : l'entraînement reprend le fichier existant (ou s'en passe)
+        print("[AVERTISSEMENT] Aucune station voisine n'a pu être récupérée, fichier des voisins inchangé.")
+        return
+    print(f"[OK] {STATIONS_ERREURS_CSV} : {len(tableau)} lignes, {tableau['station'].nunique()} stations.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import argparse
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from config import EXPORTS_DIR, DERNIERE_ARROW
+
+# Schéma des colonnes de partition (chemins Hive écrits par export.py)
+PARTITIONS = ds.partitioning(
+    pa.schema([("mois_emission", pa.string()), ("station", pa.string())]), flavor="hive"
+)
+
+
+def dernieres_corrections(stations: list[str] | None = None, chemin_fichier: str = DERNIERE_ARROW) -> pd.DataFrame:
+    """
+    Renvoie la dernière correction de chaque station demandée (toutes si None),
+    en lisant l'index Arrow en mémoire mappée, sans parcourir l'historique.
+    """
+    with pa.memory_map(chemin_fichier, "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+        if stations:
+            table = table.filter(pc.is_in(table["station"], value_set=pa.array(stations)))
+        return table.to_pandas()
+
+
+def historique_corrections(stations: list[str] | None = None, debut: str | None = None, fin: str | None = None,
+                           dossier: str = EXPORTS_DIR) -> pd.DataFrame:
+    """
+    Renvoie les corrections des stations demandées entre 'debut' et 'fin' (dates prévues, incluses).
+    Les filtres portent sur les colonnes de partition : seules les partitions
+    (mois d'émission, station) concernées sont lues.
+    """
+    jeu = ds.dataset(Path(dossier) / "corrections", format="parquet", partitioning=PARTITIONS)
+
+    conditions = []
+    if stations:
+        conditions.append(ds.field("station").isin(stations))
+    if debut:
+        # La date d'émission est la veille de la date prévue
+        mois_debut = (pd.to_datetime(debut) - pd.Timedelta(days=1)).strftime("%Y-%m")
+        conditions += [ds.field("mois_emission") >= mois_debut, ds.field("date") >= debut]
+    if fin:
+        conditions += [ds.field("mois_emission") <= fin[:7], ds.field("date") <= fin]
+    filtre = None
+    for condition in conditions:
+        filtre = condition if filtre is None else filtre & condition
+
+    tableau = jeu.to_table(filter=filtre).to_pandas().drop(columns="mois_emission")
+    colonnes = ["station"] + [c for c in tableau.columns if c != "station"]
+    return tableau[colonnes].sort_values(["station", "date"]).reset_index(drop=True)
+
+
+def main():
+    """Affiche les dernières corrections (par défaut) ou l'historique d'une période."""
+    parseur = argparse.ArgumentParser(description="Lecture des prévisions corrigées exportées.")
+    parseur.add_argument("stations", nargs="*", help="stations à lire (toutes par défaut)")
+    parseur.add_argument("--debut", help="première date prévue (AAAA-MM-JJ) : active l'historique")
+    parseur.add_argument("--fin", help="dernière date prévue (AAAA-MM-JJ) : active l'historique")
+    arguments = parseur.parse_args()
+
+    try:
+        if arguments.debut or arguments.fin:
+            tableau = historique_corrections(arguments.stations, arguments.debut, arguments.fin)
+        else:
+            tableau = dernieres_corrections(arguments.stations)
+    except FileNotFoundError:
+        print(f"[ERREUR] Aucun export trouvé dans {EXPORTS_DIR}/ : lancer d'abord `python src/export.py`.")
+        sys.exit(1)
+
+    print(tableau.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# src/metriques.py
+
+from pathlib import Path
+
+import pandas as pd
+
+from config import TARGETS
+
+COLONNES_METRIQUES = ["station", "mois", "cible", "jours", "mae_brute", "mae_corrigee"]
+
+
+def calculer_metriques_mensuelles(predictions: pd.DataFrame, observations: pd.DataFrame, station: str,
+                                  mois: list[str] | None = None) -> pd.DataFrame:
+    """
+    Calcule, par mois (de la date prévue) et par cible, la MAE de la prévision brute
+    et celle de la correction publiée, limitées aux mois demandés (tous si None).
+    """
+    tableau = predictions.merge(observations, on="date", how="inner")
+    tableau["mois"] = tableau["date"].str[:7]
+    if mois is not None:
+        tableau = tableau[tableau["mois"].isin(mois)]
+
+    resultats = []
+    for cible in TARGETS:
+        erreurs = pd.DataFrame({
+            "mois": tableau["mois"],
+            "brute": (tableau[f"{cible}_obs"] - tableau[f"{cible}_prev"]).abs(),
+            "corrigee": (tableau[f"{cible}_obs"] - tableau[f"{cible}_corr"]).abs(),
+        }).dropna()
+        groupes = erreurs.groupby("mois").agg(
+            jours=("brute", "size"), mae_brute=("brute", "mean"), mae_corrigee=("corrigee", "mean")
+        )
+        resultats.append(groupes.reset_index().assign(station=station, cible=cible))
+
+    return pd.concat(resultats, ignore_index=True)[COLONNES_METRIQUES].round(3)
+
+
+def mettre_a_jour_metriques(predictions: pd.DataFrame, observations: pd.DataFrame, station: str,
+                            dates_modifiees: list[str], chemin_fichier: str) -> list[str]:
+    """
+    Recalcule uniquement les partitions (station, mois) qui contiennent une date
+    dont l'observation a changé ; tout est calculé si le fichier n'existe pas encore.
+
+    Returns:
+        list[str]: les mois recalculés
+    """
+    chemin = Path(chemin_fichier)
+    if chemin.exists():
+        if not dates_modifiees:
+            return []
+        mois = sorted({d[:7] for d in dates_modifiees})
+        anciennes = pd.read_csv(chemin)
+        anciennes = anciennes[~((anciennes["station"] == station) & anciennes["mois"].isin(mois))]
+    else:
+        mois, anciennes = None, None
+
+    nouvelles = calculer_metriques_mensuelles(predictions, observations, station, mois)
+    if mois is None:
+        mois = sorted(nouvelles["mois"].unique())
+    if anciennes is not None:
+        nouvelles = pd.concat([anciennes, nouvelles], ignore_index=True)
+
+    chemin.parent.mkdir(parents=True, exist_ok=True)
+    nouvelles.sort_values(["station", "mois", "cible"]).to_csv(chemin, index=False)
+    return mois
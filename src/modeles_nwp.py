@@ -0,0 +1,104 @@
+# src/modeles_nwp.py
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import requests
+
+# Variables quotidiennes Open-Meteo récupérées pour chaque modèle NWP
+VARIABLES_API = {
+    "tmax": "temperature_2m_max",
+    "tmin": "temperature_2m_min",
+}
+
+# Nombre minimal de jours renseignés avant qu'un modèle serve de variable explicative
+JOURS_MINIMUM_MODELE = 60
+
+
+def colonne_modele(variable: str, modele: str) -> str:
+    """Nom de la colonne d'une prévision de modèle, ex. 'tmax_prev_ecmwf_ifs025'."""
+    return f"{variable}_prev_{modele}"
+
+
+def recuperer_modele(url: str, parametres: dict, modele: str) -> pd.DataFrame:
+    """
+    Récupère les prévisions quotidiennes d'un seul modèle NWP via Open-Meteo.
+
+    Returns:
+        pd.DataFrame: colonnes 'date', 'tmax_prev_<modele>', 'tmin_prev_<modele>'
+    """
+    params = dict(parametres, models=modele, daily=",".join(VARIABLES_API.values()))
+
+    r = requests.get(url, params=params, timeout=30)
+    r.raise_for_status()
+    daily = r.json().get("daily", {})
+
+    tableau = pd.DataFrame({"date": pd.to_datetime(daily.get("time", [])).strftime("%Y-%m-%d")})
+    for variable, cle in VARIABLES_API.items():
+        # Open-Meteo suffixe les clés par le modèle quand plusieurs sont demandés
+        valeurs = daily.get(f"{cle}_{modele}", daily.get(cle, [None] * len(tableau)))
+        tableau[colonne_modele(variable, modele)] = pd.to_numeric(pd.Series(valeurs), errors="coerce")
+
+    return tableau
+
+
+def recuperer_modeles(url: str, parametres: dict, modeles: list[str]) -> pd.DataFrame:
+    """
+    Récupère plusieurs modèles NWP en requêtes concurrentes et les assemble
+    en un tableau large indexé par date (deux colonnes par modèle).
+    Un modèle en échec est ignoré : ses colonnes restent simplement absentes.
+    """
+    def tache(modele):
+        try:
+            return recuperer_modele(url, parametres, modele)
+        except (requests.RequestException, ValueError) as e:
+            print(f"[AVERTISSEMENT] Modèle {modele} indisponible : {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, len(modeles))) as executeur:
+        resultats = [t for t in executeur.map(tache, modeles) if t is not None]
+
+    if not resultats:
+        return pd.DataFrame(columns=["date"])
+
+    # Concaténation par colonnes sur l'index date (pas de jointure en cascade)
+    tableau = pd.concat([t.set_index("date") for t in resultats], axis=1)
+    return tableau.rename_axis("date").reset_index()
+
+
+def fusionner_modeles(ancien: pd.DataFrame | None, nouveau: pd.DataFrame) -> pd.DataFrame:
+    """
+    Met à jour le tableau des modèles : les valeurs de 'nouveau' remplacent
+    celles de 'ancien' pour les mêmes dates, les nouvelles colonnes sont ajoutées.
+    """
+    if ancien is None or ancien.empty:
+        return nouveau.sort_values("date").reset_index(drop=True)
+
+    fusion = nouveau.set_index("date").combine_first(ancien.set_index("date"))
+    return fusion.rename_axis("date").reset_index().sort_values("date").reset_index(drop=True)
+
+
+def charger_previsions_modeles(chemin_fichier: str) -> pd.DataFrame | None:
+    """Lit le CSV des modèles NWP, ou renvoie None s'il est absent ou vide."""
+    try:
+        tableau = pd.read_csv(chemin_fichier)
+    except (FileNotFoundError, pd.errors.EmptyDataError):
+        return None
+    return tableau if "date" in tableau.columns else None
+
+
+def modeles_disponibles(tableau: pd.DataFrame | None, modeles: list[str],
+                        jours_minimum: int = JOURS_MINIMUM_MODELE) -> list[str]:
+    """
+    Renvoie les modèles de la liste dont les colonnes tmax et tmin existent dans le tableau
+    et sont renseignées sur au moins 'jours_minimum' jours (un modèle tout juste ajouté
+    n'est utilisé qu'une fois son historique suffisant).
+    """
+    if tableau is None:
+        return []
+    disponibles = []
+    for m in modeles:
+        colonnes = [colonne_modele(v, m) for v in VARIABLES_API]
+        if all(c in tableau.columns for c in colonnes) and tableau[colonnes].notna().all(axis=1).sum() >= jours_minimum:
+            disponibles.append(m)
+    return disponibles
@@ -5,25 +5,30 @@ import numpy as np
 import pandas as pd
 from joblib import load
 
-from config import FORECASTS_CSV, OBS_CSV
-from features import prepare_merged
+from config import (DELAI_OBSERVATIONS, FORECASTS_CSV, OBS_CSV, FORECASTS_MODELES_CSV, MODELES_NWP, PREDICTIONS_CSV,
+                    STATION, STATIONS, NB_VOISINS, STATIONS_ERREURS_CSV, VOISINS_JSON)
+from features import prepare_merged, ajouter_variables_modeles, ajouter_variables_memoire, COLONNES_MEMOIRE
+from modeles_nwp import charger_previsions_modeles, modeles_disponibles
+from voisins import preparer_variables_voisins
 
 
 CHEMIN_DERNIER_JSON = Path("last_prediction.json")      # compatibilité CI
-CHEMIN_HISTORIQUE_CSV = Path("data/predictions.csv")   # historique cumulatif
+CHEMIN_HISTORIQUE_CSV = Path(PREDICTIONS_CSV)          # historique cumulatif
 
 
-def construire_variables_explicatives(ligne_prevision: pd.Series, historique: pd.DataFrame, variable_cible: str) -> pd.DataFrame:
+def construire_variables_explicatives(ligne_prevision: pd.Series, historique: pd.DataFrame, variable_cible: str,
+                                      ordre_colonnes: list[str]) -> pd.DataFrame:
     """
-    Construit une ligne de variables explicatives pour le modèle de correction.
+    Construit une ligne de variables explicatives pour le modèle de correction,
+    dans l'ordre des colonnes vues à l'entraînement.
     """
     date_du_jour = pd.to_datetime(ligne_prevision["date"])
     jour_annee = date_du_jour.dayofyear
     saison_sin = np.sin(2 * np.pi * jour_annee / 365)
     saison_cos = np.cos(2 * np.pi * jour_annee / 365)
     
-    # Récupère la dernière ligne de l'historique pour les features de mémoire
-    dernier_jour_historique = historique.iloc[-1]
+    # Features de mémoire calculées pour la date cible, en jours calendaires (comme à l'entraînement)
+    memoire = variables_memoire_prevision(ligne_prevision["date"], historique)
 
     valeurs = {
         # Variables de base
@@ -36,27 +41,51 @@ def construire_variables_explicatives(ligne_prevision: pd.Series, historique: pd
         "sun_prev": float(ligne_prevision.get("sun_prev", 0.0)),
         "cloud_prev": float(ligne_prevision.get("cloud_prev", 0.0)),
 
-        # Features de mémoire basées sur le DERNIER jour de l'historique
-        "err_tmax_j1": float(dernier_jour_historique.get("err_tmax", 0.0)), # L'erreur d'hier est l'erreur du dernier jour connu
-        "err_tmax_j2": float(dernier_jour_historique.get("err_tmax_j1", 0.0)),
-        "err_tmax_moy_7j": float(dernier_jour_historique.get("err_tmax_moy_7j", 0.0)),
-        "err_tmax_std_7j": float(dernier_jour_historique.get("err_tmax_std_7j", 0.0)),
-        "err_tmin_j1": float(dernier_jour_historique.get("err_tmin", 0.0)),
-        "err_tmin_j2": float(dernier_jour_historique.get("err_tmin_j1", 0.0)),
-        "err_tmin_moy_7j": float(dernier_jour_historique.get("err_tmin_moy_7j", 0.0)),
-        "err_tmin_std_7j": float(dernier_jour_historique.get("err_tmin_std_7j", 0.0)),
+        # Features de mémoire : dernières erreurs connues à l'émission (NaN si ces jours manquent)
+        **{colonne: float(memoire[colonne]) for colonne in COLONNES_MEMOIRE},
     }
 
-    # L'ordre DOIT être le même que celui utilisé dans train.py
-    ordre_colonnes = [
-        f"{variable_cible}_prev", "doy_sin", "doy_cos", "prcp_prev", "ws_prev",
-        "rad_prev", "sun_prev", "cloud_prev", "err_tmax_j1", "err_tmax_j2",
-        "err_tmax_moy_7j", "err_tmax_std_7j", "err_tmin_j1", "err_tmin_j2",
-        "err_tmin_moy_7j", "err_tmin_std_7j",
-    ]
+    # Variables des modèles NWP et des voisins déjà calculées sur la ligne
+    for colonne in ordre_colonnes:
+        if colonne not in valeurs:
+            # Valeur manquante laissée en NaN, comme à l'entraînement
+            valeurs[colonne] = float(ligne_prevision.get(colonne, np.nan))
+
     return pd.DataFrame([valeurs], columns=ordre_colonnes)
 
 
+def variables_memoire_prevision(date_cible: str, historique: pd.DataFrame, fenetre: int = 7) -> pd.Series:
+    """
+    Calcule les variables de mémoire de la date cible en ajoutant une ligne
+    (erreur inconnue) à la fin des derniers jours de l'historique, avec la même
+    définition qu'à l'entraînement (erreurs connues jusqu'à J-DELAI_OBSERVATIONS).
+    """
+    date_min = (pd.to_datetime(date_cible) - pd.Timedelta(days=fenetre + DELAI_OBSERVATIONS)).strftime("%Y-%m-%d")
+    recents = historique.loc[(historique["date"] >= date_min) & (historique["date"] < date_cible),
+                             ["date", "err_tmax", "err_tmin"]]
+    recents = pd.concat([recents, pd.DataFrame([{"date": date_cible}])], ignore_index=True)
+    return ajouter_variables_memoire(recents).iloc[-1]
+
+
+def ajouter_modeles_a_prevision(ligne_prevision: pd.Series, previsions_hist: pd.DataFrame,
+                                observations_hist: pd.DataFrame, previsions_modeles: pd.DataFrame,
+                                modeles: list[str], fenetre: int = 7) -> pd.Series:
+    """
+    Calcule les variables des modèles NWP pour la prévision à corriger,
+    à partir des seuls derniers jours (fenêtre jusqu'à J-DELAI_OBSERVATIONS, comme à
+    l'entraînement) et non de tout l'historique.
+    """
+    date_cible = ligne_prevision["date"]
+    date_min = (pd.to_datetime(date_cible) - pd.Timedelta(days=fenetre + DELAI_OBSERVATIONS)).strftime("%Y-%m-%d")
+    recents = previsions_hist[(previsions_hist["date"] >= date_min) & (previsions_hist["date"] <= date_cible)]
+    recents = recents.sort_values("date")[["date", "tmax_prev", "tmin_prev"]]
+    recents = recents.merge(observations_hist[["date", "tmax_obs", "tmin_obs"]], on="date", how="left")
+    recents = recents.merge(previsions_modeles, on="date", how="left")
+
+    recents = ajouter_variables_modeles(recents, modeles, fenetre)
+    return pd.concat([ligne_prevision, recents.iloc[-1].drop(["date", "tmax_prev", "tmin_prev"])])
+
+
 def sauvegarder_dernier_json(prediction: dict) -> None:
     """Écrit la dernière prédiction dans last_prediction.json (pour la CI)."""
     with open(CHEMIN_DERNIER_JSON, "w", encoding="utf-8") as fichier:
@@ -88,7 +117,16 @@ def main():
     # 1) Charger TOUTES les données pour avoir l'historique
     previsions_hist = pd.read_csv(FORECASTS_CSV)
     observations_hist = pd.read_csv(OBS_CSV)
-    historique_complet = prepare_merged(previsions_hist, observations_hist)
+    previsions_modeles = charger_previsions_modeles(FORECASTS_MODELES_CSV)
+    modeles = modeles_disponibles(previsions_modeles, MODELES_NWP)
+    # Les variables de voisinage sont calculées jusqu'à la date de la prévision à corriger
+    variables_voisins = preparer_variables_voisins(
+        STATIONS_ERREURS_CSV, STATIONS, STATION, NB_VOISINS, VOISINS_JSON,
+        dates_cibles=pd.Index([previsions_hist["date"].max()])
+    )
+    historique_complet = prepare_merged(
+        previsions_hist, observations_hist, previsions_modeles, modeles, variables_voisins
+    )
     historique_complet = historique_complet.sort_values("date")
 
     if historique_complet.empty:
@@ -96,14 +134,27 @@ def main():
 
     # On prend la dernière prévision brute à corriger
     derniere_prevision = previsions_hist.sort_values("date").iloc[-1]
+    if modeles:
+        derniere_prevision = ajouter_modeles_a_prevision(
+            derniere_prevision, previsions_hist, observations_hist, previsions_modeles, modeles
+        )
+    if variables_voisins is not None:
+        ligne_voisins = variables_voisins[variables_voisins["date"] == derniere_prevision["date"]]
+        if not ligne_voisins.empty:
+            derniere_prevision = pd.concat([derniere_prevision, ligne_voisins.iloc[0].drop("date")])
 
     # 2) Charger les modèles de correction
     modele_correction_tmax = load("models/hgb_tmax.joblib")
     modele_correction_tmin = load("models/hgb_tmin.joblib")
 
     # 3) Construire les features (en passant l'historique) et prédire la correction
-    X_tmax = construire_variables_explicatives(derniere_prevision, historique_complet, "tmax")
-    X_tmin = construire_variables_explicatives(derniere_prevision, historique_complet, "tmin")
+    # (l'ordre des colonnes est celui mémorisé par chaque modèle à l'entraînement)
+    X_tmax = construire_variables_explicatives(
+        derniere_prevision, historique_complet, "tmax", list(modele_correction_tmax.feature_names_in_)
+    )
+    X_tmin = construire_variables_explicatives(
+        derniere_prevision, historique_complet, "tmin", list(modele_correction_tmin.feature_names_in_)
+    )
 
     correction_tmax = float(modele_correction_tmax.predict(X_tmax)[0])
     correction_tmin = float(modele_correction_tmin.predict(X_tmin)[0])
@@ -117,6 +168,11 @@ def main():
         "tmin_corr": round(float(derniere_prevision["tmin_prev"]) + correction_tmin, 1),
         "modeles_utilises": {"tmax": "hgb_tmax.joblib", "tmin": "hgb_tmin.joblib"},
     }
+    if modeles:
+        # Prévision combinée des modèles NWP (débiaisés, pondérés par leur MAE récente)
+        prediction["tmax_blend"] = round(float(derniere_prevision["tmax_prev_blend"]), 1)
+        prediction["tmin_blend"] = round(float(derniere_prevision["tmin_prev_blend"]), 1)
+        prediction["modeles_nwp"] = modeles
 
     # 5) Afficher pour les logs/CI + sauvegarder JSON + mettre à jour l'historique CSV
     print(json.dumps(prediction, ensure_ascii=False))
@@ -0,0 +1,162 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+import requests
+from dateutil import tz
+
+from config import LAT, LON, TIMEZONE, OBS_CSV, QUARANTAINE_CSV, STATION, RECALCUL_JSON
+from seed_history import recuperer_observations_openmeteo
+from validation import valider, mettre_en_quarantaine, trous_de_dates, retirer_non_publiees, BORNES_OBS
+
+# Jours récents toujours re-téléchargés : l'archive Open-Meteo révise encore ces valeurs
+JOURS_REVISION = 7
+
+# Deux plages séparées de moins de ECART_FUSION jours présents sont fusionnées en une requête
+ECART_FUSION = 5
+
+# Écart (°C / mm) en dessous duquel une valeur révisée est considérée inchangée
+TOLERANCE = 0.05
+
+
+def plages_a_recuperer(observations: pd.DataFrame | None, date_fin: str) -> list[tuple[str, str]]:
+    """
+    Liste les plages (début, fin) à re-télécharger : les trous de l'historique
+    jusqu'à 'date_fin' et les JOURS_REVISION derniers jours (valeurs encore révisables).
+    """
+    fin = pd.to_datetime(date_fin)
+    debut_revision = (fin - timedelta(days=JOURS_REVISION - 1)).strftime("%Y-%m-%d")
+    plages = [(debut_revision, date_fin)]
+
+    if observations is not None and not observations.empty:
+        plages += trous_de_dates(observations["date"], date_fin)
+    return plages
+
+
+def regrouper_plages(plages: list[tuple[str, str]], ecart_max: int = ECART_FUSION) -> list[tuple[str, str]]:
+    """
+    Fusionne les plages qui se chevauchent ou sont séparées de moins de 'ecart_max' jours :
+    re-télécharger quelques jours déjà présents coûte moins qu'une requête de plus.
+    """
+    regroupees = []
+    for debut, fin in sorted((pd.to_datetime(d), pd.to_datetime(f)) for d, f in plages):
+        if regroupees and debut - regroupees[-1][1] <= timedelta(days=ecart_max + 1):
+            regroupees[-1][1] = max(regroupees[-1][1], fin)
+        else:
+            regroupees.append([debut, fin])
+    return [(d.strftime("%Y-%m-%d"), f.strftime("%Y-%m-%d")) for d, f in regroupees]
+
+
+def recuperer_plages(plages: list[tuple[str, str]]) -> pd.DataFrame:
+    """Télécharge les observations de toutes les plages en requêtes concurrentes."""
+    def tache(plage):
+        debut, fin = plage
+        try:
+            return recuperer_observations_openmeteo(LAT, LON, debut, fin, TIMEZONE)
+        except (requests.RequestException, RuntimeError, KeyError) as e:
+            print(f"[AVERTISSEMENT] Plage {debut} → {fin} indisponible : {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, len(plages))) as executeur:
+        resultats = [t for t in executeur.map(tache, plages) if t is not None]
+
+    if not resultats:
+        return pd.DataFrame(columns=["date", "tmax_obs", "tmin_obs", "prcp_obs"])
+    return pd.concat(resultats, ignore_index=True).drop_duplicates(subset="date", keep="last")
+
+
+def dates_modifiees(ancien: pd.DataFrame | None, nouveau: pd.DataFrame) -> list[str]:
+    """Dates nouvelles ou dont une valeur a changé de plus de TOLERANCE."""
+    if ancien is None or ancien.empty:
+        return sorted(nouveau["date"])
+
+    colonnes = ["tmax_obs", "tmin_obs", "prcp_obs"]
+    comparaison = nouveau.merge(ancien[["date"] + colonnes], on="date", how="left", suffixes=("", "_ancien"))
+
+    change = comparaison[[f"{c}_ancien" for c in colonnes]].isna().all(axis=1)
+    for c in colonnes:
+        change |= (comparaison[c] - comparaison[f"{c}_ancien"]).abs() > TOLERANCE
+    return sorted(comparaison.loc[change, "date"])
+
+
+def marquer_a_recalculer(station: str, dates: list[str], chemin_fichier: str = RECALCUL_JSON) -> None:
+    """
+    Ajoute aux dates « à recalculer » de la station les dates dont l'observation
+    a été ajoutée ou révisée : train.py en déduit les mois de métriques à recalculer
+    et s'il faut rejouer le suivi de dérive.
+    """
+    if not dates:
+        return
+
+    etat = lire_a_recalculer(chemin_fichier)
+    etat[station] = sorted(set(etat.get(station, [])) | set(dates))
+
+    chemin = Path(chemin_fichier)
+    chemin.parent.mkdir(parents=True, exist_ok=True)
+    with open(chemin, "w", encoding="utf-8") as fichier:
+        json.dump(etat, fichier, ensure_ascii=False, indent=2)
+
+
+def lire_a_recalculer(chemin_fichier: str = RECALCUL_JSON) -> dict:
+    """Renvoie {station: [dates à recalculer]} (vide si rien n'est marqué)."""
+    try:
+        with open(chemin_fichier, encoding="utf-8") as fichier:
+            return json.load(fichier)
+    except FileNotFoundError:
+        return {}
+
+
+def vider_a_recalculer(station: str, chemin_fichier: str = RECALCUL_JSON) -> None:
+    """Retire les marques d'une station une fois son suivi et ses métriques recalculés."""
+    etat = lire_a_recalculer(chemin_fichier)
+    if etat.pop(station, None) is None:
+        return
+    with open(chemin_fichier, "w", encoding="utf-8") as fichier:
+        json.dump(etat, fichier, ensure_ascii=False, indent=2)
+
+
+def main():
+    """
+    Réconcilie OBS_CSV avec l'archive Open-Meteo : comble les trous,
+    reprend les valeurs révisées des derniers jours, puis marque les dates
+    modifiées (métriques et suivi de dérive à recalculer).
+    """
+    date_hier = datetime.now(tz.gettz(TIMEZONE)).date() - timedelta(days=1)
+
+    try:
+        observations = pd.read_csv(OBS_CSV)
+    except FileNotFoundError:
+        observations = None
+
+    plages = regrouper_plages(plages_a_recuperer(observations, str(date_hier)))
+    print(f"[reconcilier] {len(plages)} requête(s) : " + ", ".join(f"{d} → {f}" for d, f in plages))
+
+    recuperees = recuperer_plages(plages)
+    publiees = retirer_non_publiees(recuperees, observations, ["tmax_obs", "tmin_obs"])
+    if len(publiees) < len(recuperees):
+        print(f"[reconcilier] {len(recuperees) - len(publiees)} jour(s) pas encore publié(s) par l'archive, "
+              "repris à la prochaine exécution.")
+    recuperees = publiees
+    recuperees, quarantaine = valider(recuperees, observations, BORNES_OBS, ["tmax_obs", "tmin_obs"])
+    mettre_en_quarantaine(quarantaine, "reconciliation", QUARANTAINE_CSV)
+
+    modifiees = dates_modifiees(observations, recuperees)
+    if not modifiees:
+        print("[OK] Observations déjà à jour, rien à réconcilier.")
+        return
+
+    nouvelles = recuperees[recuperees["date"].isin(modifiees)]
+    if observations is not None:
+        observations = pd.concat([observations[~observations["date"].isin(modifiees)], nouvelles], ignore_index=True)
+    else:
+        observations = nouvelles
+
+    observations.sort_values("date").to_csv(OBS_CSV, index=False)
+    marquer_a_recalculer(STATION, modifiees)
+    print(f"[OK] {len(modifiees)} observation(s) ajoutée(s) ou révisée(s) ({modifiees[0]} → {modifiees[-1]}).")
+
+
+if __name__ == "__main__":
+    main()
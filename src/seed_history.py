@@ -2,7 +2,9 @@ import requests
 import pandas as pd
 from datetime import date
 
-from config import LAT, LON, TIMEZONE, FORECASTS_CSV, OBS_CSV
+from config import LAT, LON, TIMEZONE, FORECASTS_CSV, OBS_CSV, FORECASTS_MODELES_CSV, MODELES_NWP, QUARANTAINE_CSV
+from modeles_nwp import recuperer_modeles
+from validation import valider, mettre_en_quarantaine, BORNES_OBS, BORNES_PREV
 
 # URL de l'historique des PRÉVISIONS Open-Meteo (même famille que l'API de prod)
 URL_HISTORIQUE_PREVISIONS = "https://historical-forecast-api.open-meteo.com/v1/forecast"
@@ -103,15 +105,38 @@ def main():
     print(f"[seed] Téléchargement prévisions historiques Open-Meteo {date_debut} → {date_fin} ...")
     df_prev = recuperer_previsions_historiques_openmeteo(LAT, LON, date_debut, date_fin, TIMEZONE)
 
+    print(f"[seed] Téléchargement des modèles NWP ({', '.join(MODELES_NWP)}) ...")
+    parametres_modeles = {
+        "latitude": LAT,
+        "longitude": LON,
+        "start_date": date_debut,
+        "end_date": date_fin,
+        "timezone": TIMEZONE,
+    }
+    df_modeles = recuperer_modeles(URL_HISTORIQUE_PREVISIONS, parametres_modeles, MODELES_NWP)
+
     print(f"[seed] Téléchargement observations Open-Meteo Archive {date_debut} → {date_fin} ...")
     df_obs = recuperer_observations_openmeteo(LAT, LON, date_debut, date_fin, TIMEZONE)
 
+    # Contrôles de qualité : les lignes rejetées ne sont pas écrites
+    df_prev, quarantaine_prev = valider(df_prev, None, BORNES_PREV, ["tmax_prev", "tmin_prev"])
+    df_obs, quarantaine_obs = valider(df_obs, None, BORNES_OBS, ["tmax_obs", "tmin_obs"])
+    mettre_en_quarantaine(quarantaine_prev, "previsions", QUARANTAINE_CSV)
+    mettre_en_quarantaine(quarantaine_obs, "observations", QUARANTAINE_CSV)
+
     # Sauvegardes (remplacent l'existant)
     df_prev.to_csv(FORECASTS_CSV, index=False)
     df_obs.to_csv(OBS_CSV, index=False)
+    if df_modeles.empty:
+        # Pas de fichier vide : fetch_forecast.py reprendra l'historique des modèles
+        print("[AVERTISSEMENT] Aucun modèle NWP récupéré, forecasts_modeles.csv non écrit.")
+    else:
+        df_modeles.to_csv(FORECASTS_MODELES_CSV, index=False)
 
     # Résumé
     print(f"[OK] forecasts.csv : {len(df_prev)} lignes (source: open-meteo-historical)")
+    if not df_modeles.empty:
+        print(f"[OK] forecasts_modeles.csv : {len(df_modeles)} lignes ({(df_modeles.shape[1] - 1) // 2} modèles)")
     print(f"[OK] observations.csv : {len(df_obs)} lignes")
 
 
@@ -1,15 +1,29 @@
 import os
+import sys
+from datetime import date
+
 import pandas as pd
 from joblib import dump
 from sklearn.ensemble import HistGradientBoostingRegressor
 from sklearn.metrics import mean_absolute_error
 from sklearn.inspection import permutation_importance
 
-from config import FORECASTS_CSV, OBS_CSV
-from features import prepare_merged
+from config import (FORECASTS_CSV, OBS_CSV, FORECASTS_MODELES_CSV, MODELES_NWP,
+                    STATION, STATIONS, NB_VOISINS, STATIONS_ERREURS_CSV, VOISINS_JSON, RECALCUL_JSON, METRIQUES_CSV,
+                    TARGETS, PREDICTIONS_CSV, DERIVE_JSON, DECISIONS_CSV)
+from features import prepare_merged, colonnes_explicatives
+from modeles_nwp import charger_previsions_modeles, modeles_disponibles
+from voisins import preparer_variables_voisins
+from reconcilier import lire_a_recalculer, vider_a_recalculer
+from metriques import mettre_a_jour_metriques
+from derive import (etat_initial, mettre_a_jour_tableau, decider_reentrainement, variables_surveillees,
+                    references_variables, charger_etats, sauvegarder_etats, journaliser_decision)
+
+LIBELLES = {"tmax": "T° Max", "tmin": "T° Min"}
 
 
-def entrainer_modele_pour_variable(dataframe_fusionne: pd.DataFrame, variable_cible: str):
+def entrainer_modele_pour_variable(dataframe_fusionne: pd.DataFrame, variable_cible: str,
+                                   modeles: list[str] = (), voisins: bool = False):
     """
     Entraîne un modèle de gradient boosting histogramme pour une variable cible donnée
     (par exemple température maximale ou minimale), en apprenant à prédire l'erreur
@@ -19,6 +33,8 @@ def entrainer_modele_pour_variable(dataframe_fusionne: pd.DataFrame, variable_ci
         dataframe_fusionne (pd.DataFrame): tableau contenant les prévisions,
                                            les observations et les variables explicatives.
         variable_cible (str): "tmax" ou "tmin"
+        modeles (list[str]): modèles NWP dont les variables sont disponibles
+        voisins (bool): utiliser les erreurs passées des stations voisines
 
     Returns:
         modele (HistGradientBoostingRegressor): modèle entraîné
@@ -28,29 +44,13 @@ def entrainer_modele_pour_variable(dataframe_fusionne: pd.DataFrame, variable_ci
     """
     colonne_erreur = f"err_{variable_cible}"
 
-    # Sélection dynamique des colonnes explicatives (features)
-    # On ajoute les nouvelles variables de mémoire et on enlève "dow_"
-    colonnes_explicatives = [
-        # Variables de base
-        f"{variable_cible}_prev",
-        "doy_sin", "doy_cos",
-        "prcp_prev", "ws_prev",
-        "rad_prev", "sun_prev", "cloud_prev",
-        
-        # Nouvelles variables de mémoire pour tmax
-        "err_tmax_j1",
-        "err_tmax_j2",
-        "err_tmax_moy_7j",
-        "err_tmax_std_7j",
-
-        # Nouvelles variables de mémoire pour tmin
-        "err_tmin_j1",
-        "err_tmin_j2",
-        "err_tmin_moy_7j",
-        "err_tmin_std_7j",
-    ]
-
-    X = dataframe_fusionne[colonnes_explicatives]
+    # Seuls les jours où l'erreur de cette variable est connue servent à l'apprentissage
+    dataframe_fusionne = dataframe_fusionne.dropna(subset=[colonne_erreur])
+
+    # Sélection des colonnes explicatives (partagée avec predict.py via features.py)
+    colonnes = colonnes_explicatives(variable_cible, modeles, voisins)
+
+    X = dataframe_fusionne[colonnes]
     y = dataframe_fusionne[colonne_erreur]
 
     # Entraînement du modèle principal
@@ -71,7 +71,7 @@ def entrainer_modele_pour_variable(dataframe_fusionne: pd.DataFrame, variable_ci
 
     print(f"\n[📈] Importance des variables (permutation) pour {variable_cible} :")
     for indice in indices_tries:
-        print(f"  - {colonnes_explicatives[indice]} : {valeurs_importance[indice]:.4f}")
+        print(f"  - {colonnes[indice]} : {valeurs_importance[indice]:.4f}")
 
     # --- Évaluation sur les 15 derniers jours (split temporel) ---
     erreur_brute, erreur_corrigee, gain_pct = None, None, None
@@ -87,14 +87,14 @@ def entrainer_modele_pour_variable(dataframe_fusionne: pd.DataFrame, variable_ci
             random_state=42
         )
         modele_temporaire.fit(
-            donnees_apprentissage[colonnes_explicatives],
+            donnees_apprentissage[colonnes],
             donnees_apprentissage[colonne_erreur]
         )
 
         # 1. Prédiction corrigée
         prediction_corrigee = (
             donnees_test[f"{variable_cible}_prev"] +
-            modele_temporaire.predict(donnees_test[colonnes_explicatives])
+            modele_temporaire.predict(donnees_test[colonnes])
         )
 
         # 2. Calcul MAE Brute (Open-Meteo vs Réalité)
@@ -122,45 +122,100 @@ def main():
     # Chargement des données de prévisions et d'observations
     tableau_previsions = pd.read_csv(FORECASTS_CSV)
     tableau_observations = pd.read_csv(OBS_CSV)
+    tableau_modeles = charger_previsions_modeles(FORECASTS_MODELES_CSV)
+    modeles = modeles_disponibles(tableau_modeles, MODELES_NWP)
+    if modeles:
+        print(f"[train] Modèles NWP utilisés : {', '.join(modeles)}")
+    variables_voisins = preparer_variables_voisins(
+        STATIONS_ERREURS_CSV, STATIONS, STATION, NB_VOISINS, VOISINS_JSON
+    )
+    avec_voisins = variables_voisins is not None
+    if avec_voisins:
+        print(f"[train] Variables des {NB_VOISINS} stations voisines utilisées.")
 
     # Fusion et enrichissement avec les variables explicatives
-    tableau_fusionne = prepare_merged(tableau_previsions, tableau_observations)
+    tableau_fusionne = prepare_merged(
+        tableau_previsions, tableau_observations, tableau_modeles, modeles, variables_voisins
+    )
     tableau_fusionne = tableau_fusionne.sort_values("date")
 
     # Création du dossier de sauvegarde des modèles
     os.makedirs("models", exist_ok=True)
 
-    # Entraînement pour la température maximale
-    modele_tmax, mae_brute_tmax, mae_corr_tmax, gain_tmax = entrainer_modele_pour_variable(
-        tableau_fusionne, "tmax"
-    )
-
-    # Entraînement pour la température minimale
-    modele_tmin, mae_brute_tmin, mae_corr_tmin, gain_tmin = entrainer_modele_pour_variable(
-        tableau_fusionne, "tmin"
-    )
-
-    # Sauvegarde des modèles entraînés
-    dump(modele_tmax, "models/hgb_tmax.joblib")
-    dump(modele_tmin, "models/hgb_tmin.joblib")
-
-    print("\n[OK] Modèles HistGradientBoosting enregistrés avec succès.")
-    
-    # --- Affichage des métriques de T° Max ---
-    if mae_corr_tmax is not None:
-        print(f"\n--- Métriques T° Max (sur 15 jours) ---")
-        print(f"  🌡️ MAE Brute (Open-Meteo): {mae_brute_tmax:.2f} °C")
-        print(f"  ✨ MAE Corrigée (HGB):   {mae_corr_tmax:.2f} °C")
-        print(f"  📊 Amélioration:           {gain_tmax:+.1f} %") # Ajout du '+' pour voir aussi les régressions
-
-    # --- Affichage des métriques de T° Min ---
-    if mae_corr_tmin is not None:
-        print(f"\n--- Métriques T° Min (sur 15 jours) ---")
-        print(f"  🌡️ MAE Brute (Open-Meteo): {mae_brute_tmin:.2f} °C")
-        print(f"  ✨ MAE Corrigée (HGB):   {mae_corr_tmin:.2f} °C")
-        print(f"  📊 Amélioration:           {gain_tmin:+.1f} %")
-    
-    
+    # Historique des prévisions corrigées publiées, pour le suivi de dérive
+    try:
+        corrections = pd.read_csv(PREDICTIONS_CSV)[["date"] + [f"{v}_corr" for v in TARGETS]]
+        suivi = tableau_fusionne.merge(corrections, on="date", how="inner")
+    except FileNotFoundError:
+        suivi = None
+
+    forcer = "--force" in sys.argv
+    date_du_jour = str(date.today())
+    etats = charger_etats(DERIVE_JSON)
+    etats_station = etats.setdefault(STATION, {})
+    dates_reconciliees = lire_a_recalculer(RECALCUL_JSON).get(STATION, [])
+    metriques = {}
+
+    for variable_cible in TARGETS:
+        chemin_modele = f"models/hgb_{variable_cible}.joblib"
+        etat = etats_station.get(variable_cible)
+
+        if etat is not None and "variables" in etat and suivi is not None:
+            # Des observations déjà suivies ont été révisées : on rejoue le suivi depuis l'entraînement
+            if dates_reconciliees and etat["derniere_date"] and dates_reconciliees[0] <= etat["derniere_date"]:
+                etat = etat_initial(etat["variables"], etat["date_entrainement"], etat["debut_suivi"])
+            mettre_a_jour_tableau(etat, suivi, variable_cible)
+
+        reentrainer, statistique, valeur, seuil = decider_reentrainement(
+            etat, date_du_jour, os.path.exists(chemin_modele)
+        )
+        if forcer and not reentrainer:
+            reentrainer, statistique, valeur, seuil = True, "force", float("nan"), float("nan")
+        journaliser_decision(DECISIONS_CSV, date_du_jour, STATION, variable_cible,
+                             reentrainer, statistique, valeur, seuil)
+
+        if reentrainer:
+            modele, mae_brute, mae_corr, gain = entrainer_modele_pour_variable(
+                tableau_fusionne, variable_cible, modeles, avec_voisins
+            )
+            dump(modele, chemin_modele)
+            metriques[variable_cible] = (mae_brute, mae_corr, gain)
+
+            # Nouveau modèle : le moniteur repart de zéro avec la référence de ses données d'entraînement
+            references = references_variables(tableau_fusionne, variables_surveillees(variable_cible))
+            etat = etat_initial(references, date_du_jour, str(tableau_fusionne["date"].iloc[-1]))
+
+        etats_station[variable_cible] = etat
+
+    sauvegarder_etats(etats, DERIVE_JSON)
+
+    if metriques:
+        print(f"\n[OK] Modèle(s) HistGradientBoosting enregistré(s) : {', '.join(metriques)}.")
+    else:
+        print("\n[OK] Aucune dérive détectée, modèles conservés.")
+
+    # Métriques mensuelles : seuls les mois contenant une date marquée sont recalculés
+    try:
+        mois = mettre_a_jour_metriques(pd.read_csv(PREDICTIONS_CSV), tableau_observations, STATION,
+                                       dates_reconciliees, METRIQUES_CSV)
+        if mois:
+            print(f"[train] Métriques recalculées pour {len(mois)} mois ({mois[0]} → {mois[-1]}).")
+    except FileNotFoundError:
+        pass
+
+    # Le suivi et les métriques viennent d'être recalculés : les dates marquées sont à jour
+    if dates_reconciliees:
+        print(f"[train] {len(dates_reconciliees)} date(s) modifiée(s) prises en compte "
+              f"({dates_reconciliees[0]} → {dates_reconciliees[-1]}).")
+        vider_a_recalculer(STATION, RECALCUL_JSON)
+
+    # --- Affichage des métriques des modèles réentraînés ---
+    for variable_cible, (mae_brute, mae_corr, gain) in metriques.items():
+        if mae_corr is not None:
+            print(f"\n--- Métriques {LIBELLES[variable_cible]} (sur 15 jours) ---")
+            print(f"  🌡️ MAE Brute (Open-Meteo): {mae_brute:.2f} °C")
+            print(f"  ✨ MAE Corrigée (HGB):   {mae_corr:.2f} °C")
+            print(f"  📊 Amélioration:           {gain:+.1f} %") # Ajout du '+' pour voir aussi les régressions
 
 
 if __name__ == "__main__":
@@ -0,0 +1,187 @@
+# src/validation.py
+
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+
+# Bornes physiques plausibles (min, max) pour chaque colonne contrôlée
+BORNES_OBS = {
+    "tmax_obs": (-40.0, 50.0),
+    "tmin_obs": (-45.0, 40.0),
+    "prcp_obs": (0.0, 300.0),
+}
+BORNES_PREV = {
+    "tmax_prev": (-40.0, 50.0),
+    "tmin_prev": (-45.0, 40.0),
+    "prcp_prev": (0.0, 300.0),
+    "ws_prev": (0.0, 250.0),
+    "rad_prev": (0.0, 40.0),
+    "sun_prev": (0.0, 86400.0),
+    "cloud_prev": (0.0, 100.0),
+}
+
+# Nombre de jours consécutifs identiques (tmax ET tmin) à partir duquel une valeur est jugée figée
+LIMITE_FIGEE = 3
+
+
+def valider(nouveau: pd.DataFrame, existant: pd.DataFrame | None, bornes: dict,
+            colonnes_requises: list[str], limite_figee: int = LIMITE_FIGEE) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Contrôle les lignes qui arrivent avant leur écriture :
+      - date_invalide     : date illisible
+      - valeur_manquante  : une colonne requise est vide
+      - hors_bornes       : une valeur sort des bornes physiques
+      - tmin_sup_tmax     : tmin > tmax
+      - doublon           : même date (et station) répétée dans le lot (la dernière est gardée)
+      - valeur_figee      : tmax et tmin identiques 'limite_figee' jours de suite
+
+    Tous les contrôles sont vectorisés. Seules les 'limite_figee' dernières lignes
+    de 'existant' (par station) servent d'état pour détecter les valeurs figées.
+
+    Returns:
+        (valides, quarantaine): la quarantaine porte une colonne 'motif'
+    """
+    cles = ["station", "date"] if "station" in nouveau.columns else ["date"]
+    tableau = nouveau.reset_index(drop=True).copy()
+    controles = {}
+
+    dates = pd.to_datetime(tableau["date"], errors="coerce")
+    controles["date_invalide"] = dates.isna()
+    tableau["date"] = dates.dt.strftime("%Y-%m-%d").where(dates.notna(), tableau["date"])
+
+    # Valeurs numériques (None ou texte illisible -> NaN)
+    for colonne in set(colonnes_requises) | (set(bornes) & set(tableau.columns)):
+        tableau[colonne] = pd.to_numeric(tableau[colonne], errors="coerce")
+
+    controles["valeur_manquante"] = tableau[colonnes_requises].isna().any(axis=1)
+
+    hors_bornes = pd.Series(False, index=tableau.index)
+    for colonne, (minimum, maximum) in bornes.items():
+        if colonne in tableau.columns:
+            hors_bornes |= (tableau[colonne] < minimum) | (tableau[colonne] > maximum)
+    controles["hors_bornes"] = hors_bornes
+
+    tmax, tmin = _colonnes_temperature(tableau)
+    controles["tmin_sup_tmax"] = (tableau[tmin] > tableau[tmax]) if tmax and tmin else pd.Series(False, index=tableau.index)
+
+    controles["doublon"] = tableau.duplicated(subset=cles, keep="last")
+    # Les doublons écartés ne doivent pas allonger (ni casser) une série de valeurs figées
+    controles["valeur_figee"] = pd.Series(False, index=tableau.index)
+    if tmax and tmin:
+        conserves = tableau[~controles["doublon"]]
+        controles["valeur_figee"] |= _valeurs_figees(conserves, existant, cles, limite_figee) \
+            .reindex(tableau.index, fill_value=False)
+
+    # Motif = liste des contrôles en échec, séparés par ';'
+    motif = pd.Series("", index=tableau.index)
+    for nom, masque in controles.items():
+        motif = motif.where(~masque, motif + nom + ";")
+    motif = motif.str.rstrip(";")
+
+    en_echec = motif != ""
+    quarantaine = tableau[en_echec].assign(motif=motif[en_echec])
+    return tableau[~en_echec].reset_index(drop=True), quarantaine.reset_index(drop=True)
+
+
+def _colonnes_temperature(tableau: pd.DataFrame) -> tuple[str | None, str | None]:
+    """Renvoie les noms des colonnes tmax/tmin du tableau (ex. 'tmax_obs', 'tmin_obs')."""
+    tmax = next((c for c in ("tmax_obs", "tmax_prev") if c in tableau.columns), None)
+    tmin = next((c for c in ("tmin_obs", "tmin_prev") if c in tableau.columns), None)
+    return tmax, tmin
+
+
+def _valeurs_figees(tableau: pd.DataFrame, existant: pd.DataFrame | None,
+                    cles: list[str], limite_figee: int) -> pd.Series:
+    """
+    Marque les lignes qui prolongent une série d'au moins 'limite_figee' jours
+    consécutifs avec exactement les mêmes tmax et tmin.
+    """
+    tmax, tmin = _colonnes_temperature(tableau)
+    colonnes = cles + [tmax, tmin]
+
+    contexte = None
+    if existant is not None and not existant.empty and set(colonnes) <= set(existant.columns):
+        contexte = existant[colonnes].sort_values(cles)
+        if "station" in cles:
+            contexte = contexte.groupby("station").tail(limite_figee - 1)
+        else:
+            contexte = contexte.tail(limite_figee - 1)
+        # Les lignes du lot remplacent celles du contexte à la même clé
+        contexte = contexte.merge(tableau[cles], on=cles, how="left", indicator=True)
+        contexte = contexte[contexte["_merge"] == "left_only"].drop(columns="_merge")
+
+    lot = tableau[colonnes].assign(_ligne=tableau.index)
+    serie = pd.concat([contexte, lot], ignore_index=True) if contexte is not None else lot
+    serie = serie.sort_values(cles, kind="stable").reset_index(drop=True)
+
+    # Une nouvelle « série » commence dès que la valeur change, qu'un jour manque ou que la station change
+    dates = pd.to_datetime(serie["date"], errors="coerce")
+    rupture = (
+        (serie[tmax] != serie[tmax].shift(1))
+        | (serie[tmin] != serie[tmin].shift(1))
+        | (dates - dates.shift(1) != pd.Timedelta(days=1))
+    )
+    if "station" in cles:
+        rupture |= serie["station"] != serie["station"].shift(1)
+
+    numero_serie = rupture.cumsum()
+    longueur = serie.groupby(numero_serie).cumcount() + 1
+
+    figee = (longueur >= limite_figee) & serie["_ligne"].notna()
+    resultat = pd.Series(False, index=tableau.index)
+    resultat[serie.loc[figee, "_ligne"].astype(int).to_numpy()] = True
+    return resultat
+
+
+def retirer_non_publiees(nouveau: pd.DataFrame, existant: pd.DataFrame | None,
+                         colonnes_requises: list[str]) -> pd.DataFrame:
+    """
+    Retire les jours que la source ne publie pas encore (une valeur requise nulle)
+    et absents de 'existant' : ils seront repris à la prochaine exécution, sans passer
+    par la quarantaine. Une date déjà stockée qui revient nulle reste soumise aux contrôles.
+    """
+    vides = nouveau[colonnes_requises].isna().any(axis=1)
+    if existant is not None:
+        vides &= ~nouveau["date"].isin(existant["date"])
+    return nouveau[~vides]
+
+
+def trous_de_dates(dates: pd.Series, date_fin: str | None = None) -> list[tuple[str, str]]:
+    """
+    Renvoie les plages de dates absentes (début, fin incluses) entre la première
+    date de la série et 'date_fin' (par défaut la dernière date présente).
+    """
+    presentes = pd.DatetimeIndex(pd.to_datetime(dates, errors="coerce").dropna().unique()).sort_values()
+    if presentes.empty:
+        return []
+
+    fin = pd.to_datetime(date_fin) if date_fin is not None else presentes[-1]
+    manquantes = pd.date_range(presentes[0], fin, freq="D").difference(presentes)
+    if manquantes.empty:
+        return []
+
+    # Regroupe les jours manquants consécutifs en plages
+    numero_plage = (manquantes.to_series().diff() != pd.Timedelta(days=1)).cumsum()
+    plages = manquantes.to_series().groupby(numero_plage.to_numpy()).agg(["min", "max"])
+    return [(debut.strftime("%Y-%m-%d"), fin.strftime("%Y-%m-%d")) for debut, fin in plages.itertuples(index=False)]
+
+
+def mettre_en_quarantaine(quarantaine: pd.DataFrame, source: str, chemin_fichier: str) -> None:
+    """Ajoute les lignes rejetées (avec leur source et l'heure du contrôle) au CSV de quarantaine."""
+    if quarantaine.empty:
+        return
+
+    lignes = quarantaine.assign(
+        source_controle=source,
+        date_controle=datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+    )
+    chemin = Path(chemin_fichier)
+    chemin.parent.mkdir(parents=True, exist_ok=True)
+    if chemin.exists():
+        lignes = pd.concat([pd.read_csv(chemin), lignes], ignore_index=True)
+    lignes.to_csv(chemin, index=False)
+
+    print(f"[QUARANTAINE] {source} : {len(quarantaine)} ligne(s) rejetée(s) -> {chemin_fichier}")
+    for motif, nombre in quarantaine["motif"].value_counts().items():
+        print(f"  - {motif} : {nombre}")
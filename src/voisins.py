@@ -0,0 +1,138 @@
+# src/voisins.py
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import BallTree
+
+from config import DELAI_OBSERVATIONS
+
+RAYON_TERRE_KM = 6371.0
+
+
+def construire_voisins(stations: dict, nb_voisins: int) -> dict:
+    """
+    Construit un index spatial (BallTree, distance haversine) sur le registre
+    des stations et renvoie, pour chaque station, ses plus proches voisines
+    avec leur distance en km (la station elle-même est exclue).
+    """
+    noms = list(stations)
+    coordonnees = np.radians([stations[nom] for nom in noms])
+    k = min(nb_voisins, len(noms) - 1)
+
+    index = BallTree(coordonnees, metric="haversine")
+    distances, indices = index.query(coordonnees, k=k + 1)
+
+    # La première colonne est la station elle-même (distance nulle)
+    return {
+        nom: {
+            "voisins": [noms[j] for j in indices[i, 1:]],
+            "distances_km": [round(float(d) * RAYON_TERRE_KM, 3) for d in distances[i, 1:]],
+        }
+        for i, nom in enumerate(noms)
+    }
+
+
+def charger_voisins(stations: dict, nb_voisins: int, chemin_cache: str) -> dict:
+    """
+    Renvoie les listes de voisins depuis le cache JSON, ou les reconstruit
+    (et réécrit le cache) si le registre des stations ou k a changé.
+    """
+    signature = {"stations": {nom: list(coord) for nom, coord in stations.items()}, "nb_voisins": nb_voisins}
+
+    chemin = Path(chemin_cache)
+    if chemin.exists():
+        with open(chemin, encoding="utf-8") as fichier:
+            cache = json.load(fichier)
+        if cache.get("signature") == signature:
+            return cache["voisins"]
+
+    voisins = construire_voisins(stations, nb_voisins)
+    chemin.parent.mkdir(parents=True, exist_ok=True)
+    with open(chemin, "w", encoding="utf-8") as fichier:
+        json.dump({"signature": signature, "voisins": voisins}, fichier, ensure_ascii=False, indent=2)
+    return voisins
+
+
+def calculer_variables_voisins(erreurs_stations: pd.DataFrame, voisins: dict,
+                               dates_cibles: pd.Index | None = None,
+                               fenetre: int = 7, delai: int = DELAI_OBSERVATIONS) -> dict:
+    """
+    Calcule, pour TOUTES les stations en une seule passe, les erreurs passées
+    de leurs voisines pondérées par l'inverse de la distance :
+      - err_<var>_voisins_j1     : erreur des voisines à J-delai (déjà connue à l'émission)
+      - err_<var>_voisins_moy_7j : moyenne sur les 'fenetre' jours calendaires se terminant à J-delai
+    Même convention que les variables de mémoire de la station (features.ajouter_variables_memoire).
+
+    Args:
+        erreurs_stations (pd.DataFrame): colonnes 'date', 'station', 'err_tmax', 'err_tmin'
+        voisins (dict): sortie de charger_voisins()
+        dates_cibles (pd.Index|None): dates supplémentaires à couvrir (ex. demain)
+
+    Returns:
+        dict: nom de variable -> pd.DataFrame (dates × stations)
+    """
+    noms = list(voisins)
+    position = {nom: i for i, nom in enumerate(noms)}
+    indices = np.array([[position[v] for v in voisins[nom]["voisins"]] for nom in noms])
+    poids = 1.0 / np.maximum(np.array([voisins[nom]["distances_km"] for nom in noms]), 1.0)
+
+    dates = pd.to_datetime(erreurs_stations["date"])
+    debut, fin = dates.min(), dates.max()
+    if dates_cibles is not None and len(dates_cibles):
+        fin = max(fin, pd.to_datetime(dates_cibles).max())
+    # Index calendaire : un jour manquant reste un trou, il ne décale pas les lignes
+    calendrier = pd.date_range(debut, fin, freq="D")
+
+    variables = {}
+    for var in ["tmax", "tmin"]:
+        matrice = (
+            erreurs_stations.assign(date=dates)
+            .pivot_table(index="date", columns="station", values=f"err_{var}")
+            .reindex(index=calendrier, columns=noms)
+        )
+        connues = matrice.shift(delai)
+        stats = {
+            "j1": connues.to_numpy(),
+            "moy_7j": connues.rolling(window=fenetre, min_periods=1).mean().to_numpy(),
+        }
+
+        for nom_stat, valeurs in stats.items():
+            # Rassemblement vectorisé : (jours, stations, voisins)
+            valeurs_voisins = valeurs[:, indices]
+            poids_valides = np.where(np.isnan(valeurs_voisins), 0.0, poids[None, :, :])
+            somme_poids = poids_valides.sum(axis=2)
+            moyenne = np.divide(
+                (np.nan_to_num(valeurs_voisins) * poids_valides).sum(axis=2), somme_poids,
+                out=np.full(somme_poids.shape, np.nan), where=somme_poids > 0,
+            )
+            variables[f"err_{var}_voisins_{nom_stat}"] = pd.DataFrame(moyenne, index=calendrier, columns=noms)
+
+    return variables
+
+
+def variables_voisins_station(variables: dict, station: str) -> pd.DataFrame:
+    """Extrait les variables de voisinage d'une station, avec une colonne 'date' au format du projet."""
+    tableau = pd.DataFrame({nom: matrice[station] for nom, matrice in variables.items()})
+    tableau.index = tableau.index.strftime("%Y-%m-%d")
+    return tableau.rename_axis("date").reset_index()
+
+
+def preparer_variables_voisins(chemin_erreurs: str, stations: dict, station: str, nb_voisins: int,
+                               chemin_cache: str, dates_cibles: pd.Index | None = None) -> pd.DataFrame | None:
+    """
+    Charge les erreurs des stations et renvoie les variables de voisinage
+    de 'station' (colonne 'date' + err_<var>_voisins_*), ou None sans données.
+    """
+    try:
+        erreurs_stations = pd.read_csv(chemin_erreurs)
+    except (FileNotFoundError, pd.errors.EmptyDataError):
+        return None
+    if erreurs_stations.empty:
+        return None
+
+    voisins = charger_voisins(stations, nb_voisins, chemin_cache)
+    variables = calculer_variables_voisins(erreurs_stations, voisins, dates_cibles)
+    return variables_voisins_station(variables, station)